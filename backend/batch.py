@@ -0,0 +1,119 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from tracing import log_event
+
+VIDEO_ID_RE = re.compile(r"^[a-zA-Z0-9_-]{11}$")
+
+
+class LocalPlaylistResolver:
+    """Stand-in playlist lookup backed by a JSON file: {"<playlist id>": ["<url or video id>", ...]}.
+
+    The file is re-read whenever it changes, so playlists can be added
+    without a restart.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._mtime = None
+        self._playlists: Dict[str, List[str]] = {}
+
+    async def resolve(self, playlist_id: str) -> List[str]:
+        playlists = await asyncio.to_thread(self._load)
+        if playlist_id not in playlists:
+            raise LookupError(f"Unknown playlist {playlist_id}")
+        return list(playlists[playlist_id])
+
+    def _load(self) -> Dict[str, List[str]]:
+        """The file's playlists, read again only when its mtime changed"""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        mtime = os.path.getmtime(self.path)
+        if mtime != self._mtime:
+            with open(self.path, encoding="utf-8") as f:
+                playlists = json.load(f)
+            self._playlists, self._mtime = playlists, mtime
+        return self._playlists
+
+
+class BatchPipeline:
+    """Runs many videos through extract -> fetch -> generate with a concurrency limit per stage.
+
+    The stage semaphores are shared by every batch, so total throughput is
+    set by the limits, not by how many batches or clients are connected.
+    Results are yielded per item as soon as each one finishes.
+    """
+
+    def __init__(self, extract: Callable[[str], Optional[str]], fetch: Callable[[str], Awaitable[Any]],
+                 generate: Callable[[str, Any, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 fetch_concurrency: int = 8, generate_concurrency: int = 4):
+        self.extract = extract
+        self.fetch = fetch
+        self.generate = generate
+        self.fetch_concurrency = fetch_concurrency
+        self.generate_concurrency = generate_concurrency
+        self._fetch_slots = asyncio.Semaphore(fetch_concurrency)
+        self._generate_slots = asyncio.Semaphore(generate_concurrency)
+        self.active = {"fetch": 0, "generate": 0}
+        self.stats = {"batches": 0, "items": 0, "succeeded": 0, "failed": 0}
+
+    def video_id(self, source: str) -> Optional[str]:
+        source = source.strip()
+        if VIDEO_ID_RE.match(source):
+            return source
+        return self.extract(source)
+
+    async def _stage(self, name: str, slots: asyncio.Semaphore, coro_factory, timings: dict):
+        async with slots:
+            self.active[name] += 1
+            start = time.perf_counter()
+            try:
+                return await coro_factory()
+            finally:
+                self.active[name] -= 1
+                timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    async def run_item(self, index: int, source: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        item: Dict[str, Any] = {"index": index, "source": source}
+        timings: Dict[str, float] = {}
+        video_id = self.video_id(source)
+        if not video_id:
+            self.stats["failed"] += 1
+            return {**item, "status": "failed", "error": "Invalid YouTube URL"}
+        item["videoId"] = video_id
+        try:
+            segments = await self._stage("fetch", self._fetch_slots, lambda: self.fetch(video_id), timings)
+            result = await self._stage(
+                "generate", self._generate_slots, lambda: self.generate(video_id, segments, options), timings
+            )
+        except Exception as e:
+            log_event("batch_item_failed", logging.ERROR, index=index, video_id=video_id, error=repr(e))
+            self.stats["failed"] += 1
+            return {**item, "status": "failed", "error": str(e), "timings": timings}
+        self.stats["succeeded"] += 1
+        return {**item, "status": "succeeded", "result": result, "timings": timings}
+
+    async def run(self, sources: List[str], options: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        self.stats["batches"] += 1
+        self.stats["items"] += len(sources)
+        tasks = [asyncio.ensure_future(self.run_item(i, s, options)) for i, s in enumerate(sources)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # the client went away: drop items that have not started their work yet
+            for task in tasks:
+                task.cancel()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "fetch_concurrency": self.fetch_concurrency,
+            "generate_concurrency": self.generate_concurrency,
+            "active": dict(self.active),
+        }
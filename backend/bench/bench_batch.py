@@ -0,0 +1,70 @@
+"""Throughput of /api/batch against its per-stage concurrency limits.
+
+Transcripts come from a FakeTranscriptProvider and completions from a fake
+Groq client, so the numbers show how the pipeline scales with the limits
+rather than real network speed. Each run uses fresh video ids so nothing is
+served from cache.
+
+    cd backend && python3 bench/bench_batch.py --videos 40 --fetch-latency 0.2 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from batch import BatchPipeline  # noqa: E402
+from bench.fakes import FakeAsyncGroq, FakeTranscriptProvider, make_snippets  # noqa: E402
+from llm import LLMGateway  # noqa: E402
+
+LIMITS = [(1, 1), (4, 2), (8, 4), (16, 8)]
+
+
+async def run(videos: int, fetch_latency: float, latency: float):
+    fake = FakeAsyncGroq(latency=latency, content='{"keyPoints": ["a", "b"]}')
+    main.llm = LLMGateway(fake, max_concurrency=64)
+    provider = FakeTranscriptProvider(latency=fetch_latency)
+    main.transcript_engine.provider = provider
+    transport = httpx.ASGITransport(app=main.app)
+    print(f"{videos} videos, fetch latency {fetch_latency:.2f}s, LLM latency {latency:.2f}s")
+    print(f"{'fetch':>6} {'generate':>9} {'seconds':>8} {'videos/s':>9}")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        for run_index, (fetch_limit, generate_limit) in enumerate(LIMITS):
+            main.batch_pipeline = BatchPipeline(
+                main.extract_video_id, main.load_segments, main.generate_batch_item,
+                fetch_concurrency=fetch_limit, generate_concurrency=generate_limit,
+            )
+            ids = [f"r{run_index}v{i:08d}"[:11] for i in range(videos)]
+            for vid in ids:
+                provider.videos[vid] = {"manual": {"en": make_snippets(50, topic=vid)}}
+            start = time.perf_counter()
+            done = None
+            async with http.stream("POST", "/api/batch", json={"urls": ids}) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("data: ") and '"elapsedMs"' in line:
+                        done = json.loads(line[6:])
+            elapsed = time.perf_counter() - start
+            if not done or done["succeeded"] != videos:
+                raise SystemExit(f"batch did not complete: {done}")
+            print(f"{fetch_limit:>6} {generate_limit:>9} {elapsed:>8.2f} {videos / elapsed:>9.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=40)
+    parser.add_argument("--fetch-latency", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(run(args.videos, args.fetch_latency, args.latency))
+
+
+if __name__ == "__main__":
+    main_cli()
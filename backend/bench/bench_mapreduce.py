@@ -0,0 +1,55 @@
+"""Wall-clock time of map-reduce summarization against transcript length.
+
+Uses a fake LLM with fixed per-call latency, so the numbers show how the
+map fan-out and bounded parallelism scale rather than real model speed.
+
+    cd backend && python3 bench/bench_mapreduce.py --latency 0.2 --parallelism 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from bench.fakes import FakeAsyncGroq  # noqa: E402
+from cache import TieredCache  # noqa: E402
+from llm import LLMGateway  # noqa: E402
+from summarize import MapReduceSummarizer  # noqa: E402
+
+REDUCE_REPLY = '{"summary": {"title": "t", "paragraphs": ["p"], "bullets": []}, "keyPoints": [{"id": "1", "text": "k"}]}'
+SENTENCE = "In step {} the lecturer derives the update rule for gradient descent and works an example. "
+
+
+async def run(latency: float, parallelism: int, minutes: list):
+    print(f"latency={latency:.2f}s/call parallelism={parallelism}")
+    print(f"{'minutes':>8} {'chars':>9} {'chunks':>7} {'calls':>6} {'cold s':>8} {'warm s':>8}")
+    for mins in minutes:
+        # ~900 characters of speech per minute
+        transcript = "".join(SENTENCE.format(i) for i in range(max(1, (mins * 900) // len(SENTENCE))))
+        fake = FakeAsyncGroq(latency=latency, content=REDUCE_REPLY)
+        summarizer = MapReduceSummarizer(LLMGateway(fake, max_concurrency=64), TieredCache(), parallelism=parallelism)
+        start = time.perf_counter()
+        result = await summarizer.summarize(transcript, "en")
+        cold = time.perf_counter() - start
+        calls = fake.calls
+        # map results are cached, so a re-run only pays for the reduce
+        start = time.perf_counter()
+        await summarizer.summarize(transcript, "en")
+        warm = time.perf_counter() - start
+        print(f"{mins:>8} {len(transcript):>9} {result['chunks']:>7} {calls:>6} {cold:>8.2f} {warm:>8.2f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument("--minutes", type=int, nargs="+", default=[5, 15, 30, 60, 120, 240])
+    args = parser.parse_args()
+    asyncio.run(run(args.latency, args.parallelism, args.minutes))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,83 @@
+"""Scheduler behaviour against the fake Groq server under a 429 storm.
+
+Fires a burst of bulk (questions) and interactive (answer) completions
+through a real AsyncGroq client and the LLMGateway scheduler, then reports
+how many succeeded, how many retries were needed, and how long each lane
+waited.
+
+    cd backend && python3 bench/bench_rate_limits.py --bulk 20 --interactive 5 --rate-429 0.3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from groq import AsyncGroq  # noqa: E402
+
+from bench.fake_groq_server import BackgroundServer, create_app  # noqa: E402
+from llm import LLMGateway, make_http_client  # noqa: E402
+from scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, CircuitBreaker, RateLimiter  # noqa: E402
+
+
+async def run(args):
+    app = create_app(latency=args.latency, rate_429=args.rate_429, rpm=args.server_rpm)
+    with BackgroundServer(app) as server:
+        client = AsyncGroq(api_key="fake", base_url=server.url, http_client=make_http_client(), max_retries=0)
+        gateway = LLMGateway(
+            client,
+            limiter=RateLimiter(rpm=args.rpm, tpm=args.tpm, max_concurrency=args.concurrency),
+            breaker=CircuitBreaker(threshold=50),
+            max_retries=6,
+            queue_timeout=120,
+        )
+        durations = {"bulk": [], "interactive": []}
+        failures = {"bulk": 0, "interactive": 0}
+
+        async def call(lane: str, priority: int):
+            start = time.perf_counter()
+            try:
+                await gateway.complete("Explain this part of the lecture. " * 40, max_tokens=200, priority=priority)
+                durations[lane].append(time.perf_counter() - start)
+            except Exception:
+                failures[lane] += 1
+
+        start = time.perf_counter()
+        bulk = [asyncio.create_task(call("bulk", PRIORITY_BULK)) for _ in range(args.bulk)]
+        await asyncio.sleep(0.05)
+        interactive = [asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE)) for _ in range(args.interactive)]
+        await asyncio.gather(*bulk, *interactive)
+        total = time.perf_counter() - start
+        await client.close()
+
+    print(f"server: {app.state.stats}")
+    print(f"gateway: {gateway.snapshot()}")
+    for lane in ("interactive", "bulk"):
+        d = durations[lane]
+        if d:
+            print(f"{lane:>12}: ok={len(d)} failed={failures[lane]} "
+                  f"median={statistics.median(d):.2f}s max={max(d):.2f}s")
+        else:
+            print(f"{lane:>12}: ok=0 failed={failures[lane]}")
+    print(f"total wall time {total:.2f}s")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bulk", type=int, default=20)
+    parser.add_argument("--interactive", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rate-429", type=float, default=0.3)
+    parser.add_argument("--server-rpm", type=int, default=0)
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--tpm", type=int, default=1_000_000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
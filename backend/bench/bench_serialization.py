@@ -0,0 +1,139 @@
+"""Serialization time and bytes on the wire for a one-hour transcript response.
+
+Encodes a /api/process-video-sized payload with the stdlib encoder (the
+FastAPI default before orjson) and with orjson, compresses it with gzip and
+brotli, and compares the full transcript with one page of segments and with
+the transcript left out. Then fetches /api/transcript/{id} through the real
+app and middleware with each Accept-Encoding.
+
+    cd backend && python3 bench/bench_serialization.py --minutes 60 --repeat 50
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("JOBS_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-"), "jobs.sqlite3"))
+
+import httpx  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+
+import main  # noqa: E402
+from compression import brotli  # noqa: E402
+from transcripts import SegmentStore  # noqa: E402
+
+
+def hour_transcript(minutes: int, seed: int = 0) -> SegmentStore:
+    """Caption-style segments: about 150 words a minute, a new segment every 3.5 seconds.
+
+    Words come from a Zipf-weighted synthetic vocabulary, so the text
+    compresses about as well as real speech rather than like a repeated phrase.
+    """
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(3000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    snippets, t = [], 0.0
+    while t < minutes * 60:
+        snippets.append({"text": " ".join(rng.choices(vocabulary, weights, k=9)), "start": t, "duration": 3.5})
+        t += 3.5
+    return SegmentStore.from_snippets(snippets)
+
+
+def payload(segments: SegmentStore, **view) -> dict:
+    return {
+        "success": True,
+        "videoId": "dQw4w9WgXcQ",
+        "transcriptId": "tr_" + "0" * 32,
+        "videoInfo": main.video_info("dQw4w9WgXcQ"),
+        "summary": {"title": "Gradient descent", "paragraphs": ["The lecture derives the update rule."] * 3,
+                    "bullets": ["Learning rate matters"] * 5},
+        "keyPoints": [{"id": str(i), "text": f"Key point {i} about the lecture"} for i in range(1, 8)],
+        **main.transcript_view(segments, **view),
+        "timings": {"transcript": 812.4, "summary": 2210.9, "keyPoints": 1931.2, "total": 3050.0},
+    }
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def encoders(repeat: int, body: dict):
+    # FastAPI runs jsonable_encoder before the response class renders
+    stdlib, stdlib_ms = timed(lambda: JSONResponse(jsonable_encoder(body)).body, repeat)
+    fast, fast_ms = timed(lambda: ORJSONResponse(jsonable_encoder(body)).body, repeat)
+    rows = [("json (stdlib)", len(stdlib), stdlib_ms), ("orjson", len(fast), fast_ms)]
+    gz, gz_ms = timed(lambda: gzip.compress(fast, 6), repeat)
+    rows.append(("orjson + gzip 6", len(gz), fast_ms + gz_ms))
+    if brotli is not None:
+        br, br_ms = timed(lambda: brotli.compress(fast, quality=4), repeat)
+        rows.append(("orjson + brotli 4", len(br), fast_ms + br_ms))
+    return rows
+
+
+async def over_http(segments: SegmentStore, repeat: int):
+    async def fetch_segments(video_id):
+        return segments
+
+    main.fetch_segments = fetch_segments
+    main.prefetcher.enabled = False
+    rows = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for accept in ("identity", "gzip", "br"):
+            if accept == "br" and brotli is None:
+                continue
+            samples, wire = [], 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                # aiter_raw yields the body as sent, before httpx decodes it
+                async with client.stream("POST", "/api/transcript/dQw4w9WgXcQ", headers={"Accept-Encoding": accept}) as r:
+                    wire = sum([len(chunk) async for chunk in r.aiter_raw()])
+                samples.append((time.perf_counter() - start) * 1000)
+            rows.append((accept, wire, statistics.median(samples)))
+    return rows
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--page", type=int, default=200, help="segments per page for the paginated variant")
+    args = parser.parse_args()
+
+    segments = hour_transcript(args.minutes)
+    print(f"{args.minutes} min transcript: {len(segments)} segments, {len(segments.text):,} chars"
+          f"{'' if brotli is not None else ' (brotli not installed)'}")
+    variants = [
+        ("full transcript", {}),
+        (f"page of {args.page} segments", {"start": 0, "limit": args.page}),
+        ("transcript omitted", {"include": False}),
+    ]
+    for label, view in variants:
+        print(f"\n{label}")
+        print(f"{'encoding':<20} {'bytes':>10} {'median ms':>10}")
+        for name, size, ms in encoders(args.repeat, payload(segments, **view)):
+            print(f"{name:<20} {size:>10,} {ms:>10.2f}")
+
+    print("\nPOST /api/transcript/{id} through the app (orjson + compression middleware)")
+    print(f"{'accept-encoding':<20} {'wire bytes':>10} {'median ms':>10}")
+    for name, size, ms in asyncio.run(over_http(segments, args.repeat)):
+        print(f"{name:<20} {size:>10,} {ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,127 @@
+"""Local HTTP server that speaks Groq's chat-completions API.
+
+Point the backend (or a bare AsyncGroq client) at it with
+GROQ_BASE_URL=http://127.0.0.1:8900 to exercise real HTTP, retries and
+rate limiting without a Groq account.
+
+    cd backend && python3 bench/fake_groq_server.py --port 8900 --rpm 20 --rate-429 0.1
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import deque
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_REPLY = '{"summary": {"title": "Fake", "paragraphs": ["A fake summary."], "bullets": ["one"]}, "keyPoints": [{"id": "1", "text": "fake"}], "questions": []}'
+
+
+def create_app(latency: float = 0.2, rpm: int = 0, rate_429: float = 0.0, rate_500: float = 0.0,
+               reply: str = DEFAULT_REPLY, seed: int = 0) -> FastAPI:
+    """Build the fake server. rpm=0 disables the server-side rate limit."""
+    app = FastAPI()
+    rng = random.Random(seed)
+    window = deque()
+    app.state.stats = {"requests": 0, "served": 0, "rate_limited": 0, "errors": 0}
+
+    def too_many():
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": "1"},
+        )
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        stats = app.state.stats
+        stats["requests"] += 1
+        now = time.monotonic()
+        while window and window[0] <= now - 60:
+            window.popleft()
+        if (rpm and len(window) >= rpm) or rng.random() < rate_429:
+            stats["rate_limited"] += 1
+            return too_many()
+        window.append(now)
+        if rng.random() < rate_500:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "upstream overloaded"}}, status_code=503)
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+        completion_tokens = len(reply) // 4
+        base = {"id": f"fake-{stats['requests']}", "created": int(time.time()), "model": body.get("model", "fake")}
+        stats["served"] += 1
+
+        if body.get("stream"):
+            async def events():
+                pieces = [reply[i:i + 16] for i in range(0, len(reply), 16)]
+                for piece in pieces:
+                    await asyncio.sleep(latency / len(pieces))
+                    chunk = {**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency)
+        return {
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.stats
+
+    return app
+
+
+class BackgroundServer:
+    """Run a fake server on a local port in a background thread"""
+
+    def __init__(self, app: FastAPI, port: int = 0):
+        import socket
+        import uvicorn
+
+        if not port:
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                port = sock.getsockname()[1]
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def main_cli():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rpm", type=int, default=0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    args = parser.parse_args()
+    app = create_app(args.latency, args.rpm, args.rate_429, args.rate_500)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,227 @@
+"""Local stand-ins for the Groq client and transcript provider used by the benchmark scripts"""
+import asyncio
+import json
+import random
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+
+class FakeAPIError(Exception):
+    """Shaped like groq.APIStatusError: status_code plus a response with headers"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"fake HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text.encode("utf-8")) // 4)
+
+
+def _response(content: str, prompt: str = ""):
+    usage = SimpleNamespace(prompt_tokens=_tokens(prompt), completion_tokens=_tokens(content),
+                            total_tokens=_tokens(prompt) + _tokens(content))
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+def _stream_chunk(delta: str):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+
+async def _astream(owner, content: str):
+    # latency is spread over the reply, so the first token arrives early
+    pieces = [content[i:i + owner.stream_piece] for i in range(0, len(content), owner.stream_piece)]
+    total = owner.reply_latency(content)
+    for piece in pieces:
+        await asyncio.sleep(total / max(len(pieces), 1))
+        yield _stream_chunk(piece)
+
+
+class _FakeCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def create(self, **kwargs):
+        self.owner.calls += 1
+        prompt = kwargs["messages"][-1]["content"]
+        self.owner.requests.append({"model": kwargs.get("model"), "prompt": prompt, "stream": bool(kwargs.get("stream"))})
+        failure = self.owner.injected_failure()
+        if failure is not None:
+            await asyncio.sleep(self.owner.latency / 10)
+            raise failure
+        content = self.owner.reply(prompt)
+        if kwargs.get("stream"):
+            return _astream(self.owner, content)
+        await asyncio.sleep(self.owner.reply_latency(content))
+        return _response(content, prompt)
+
+
+class FakeAsyncGroq:
+    """Async Groq look-alike with configurable latency, output speed and failure injection.
+
+    `content` is the reply text, or a callable taking the prompt (see
+    `smart_reply`). With `tokens_per_second` the reply takes `latency` plus
+    its length divided by that rate. `rate_429` / `rate_500` are the
+    fractions of calls that fail with a rate-limit (carrying
+    `retry_after`) or server error.
+    """
+
+    def __init__(self, latency: float = 0.5, content="{\"summary\": {\"title\": \"t\", \"paragraphs\": [\"p\"], \"bullets\": []}}",
+                 tokens_per_second: Optional[float] = None, rate_429: float = 0.0, rate_500: float = 0.0,
+                 retry_after: Optional[float] = 0.05, seed: int = 0):
+        self.latency = latency
+        self.content = content
+        self.tokens_per_second = tokens_per_second
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        # model, prompt and stream flag of every call, for tests that check what was asked
+        self.requests = []
+        self.stream_piece = 8
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+    def reply(self, prompt: str) -> str:
+        return self.content(prompt) if callable(self.content) else self.content
+
+    def reply_latency(self, content: str) -> float:
+        if not self.tokens_per_second:
+            return self.latency
+        return self.latency + _tokens(content) / self.tokens_per_second
+
+    def injected_failure(self) -> Optional[Exception]:
+        roll = self.random.random()
+        if roll < self.rate_429:
+            self.failures += 1
+            return FakeAPIError(429, self.retry_after)
+        if roll < self.rate_429 + self.rate_500:
+            self.failures += 1
+            return FakeAPIError(503)
+        return None
+
+    async def close(self):
+        pass
+
+
+SUMMARY_REPLY = {"summary": {"title": "Gradient descent", "paragraphs": ["The lecture derives the update rule."],
+                             "bullets": ["Learning rate matters", "Convexity helps"]}}
+KEYPOINTS_REPLY = {"keyPoints": [{"id": str(i), "text": f"Key point {i} about the lecture"} for i in range(1, 6)]}
+QUESTIONS_REPLY = {"questions": [
+    {"id": str(i), "question": f"Question {i} about the update rule?", "answer": "Subtract the scaled gradient.",
+     "difficulty": ("easy", "medium", "hard", "medium")[i - 1]}
+    for i in range(1, 5)
+]}
+
+
+def smart_reply(prompt: str) -> str:
+    """Well-formed reply for whichever backend prompt this is, so no endpoint falls back"""
+    if "Translate every string in this JSON array" in prompt:
+        strings = json.loads(prompt[prompt.index("\n[") + 1:].strip())
+        return json.dumps([f"~{s}" for s in strings], ensure_ascii=False)
+    if "preparing study material" in prompt:
+        return json.dumps({**SUMMARY_REPLY, **KEYPOINTS_REPLY, **QUESTIONS_REPLY})
+    if "Combine them into one summary" in prompt:
+        return json.dumps({**SUMMARY_REPLY, **KEYPOINTS_REPLY})
+    if "compact study notes" in prompt:
+        return "- the lecturer derives the update rule\n- works an example"
+    if "practice questions" in prompt:
+        return json.dumps(QUESTIONS_REPLY)
+    if "Extract the key points" in prompt:
+        return json.dumps(KEYPOINTS_REPLY)
+    if "clean JSON summary" in prompt:
+        return json.dumps(SUMMARY_REPLY)
+    return "Gradient descent repeatedly steps against the gradient. " * 8
+
+
+class _BlockingCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, **kwargs):
+        self.owner.calls += 1
+        prompt = kwargs["messages"][-1]["content"]
+        self.owner.requests.append({"model": kwargs.get("model"), "prompt": prompt, "stream": False})
+        content = self.owner.reply(prompt)
+        time.sleep(self.owner.reply_latency(content))
+        return _response(content, prompt)
+
+
+class FakeSyncGroq(FakeAsyncGroq):
+    """Synchronous variant, mirrors the blocking `Groq` client"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chat = SimpleNamespace(completions=_BlockingCompletions(self))
+
+
+class FakeTranscriptNotFound(Exception):
+    pass
+
+
+class _FakeTranscript:
+    def __init__(self, provider, snippets):
+        self.provider = provider
+        self.snippets = snippets
+
+    def fetch(self):
+        time.sleep(self.provider.latency)
+        return list(self.snippets)
+
+
+class _FakeTranscriptList:
+    def __init__(self, provider, tracks):
+        self.provider = provider
+        self.tracks = tracks
+
+    def _find(self, kinds, languages):
+        for language in languages:
+            for kind in kinds:
+                if language in self.tracks.get(kind, {}):
+                    return _FakeTranscript(self.provider, self.tracks[kind][language])
+        raise FakeTranscriptNotFound(f"no {'/'.join(kinds)} transcript in {languages}")
+
+    def find_transcript(self, languages):
+        return self._find(("manual", "generated"), languages)
+
+    def find_generated_transcript(self, languages):
+        return self._find(("generated",), languages)
+
+
+class FakeTranscriptProvider:
+    """Stand-in for YouTubeTranscriptProvider backed by an in-memory catalogue.
+
+    `videos` maps video id -> {"manual": {lang: snippets}, "generated": {lang: snippets}}.
+    Unknown ids behave like videos without captions.
+    """
+
+    def __init__(self, videos=None, latency: float = 0.05, fail_fetch: bool = False):
+        self.videos = videos or {}
+        self.latency = latency
+        self.fail_fetch = fail_fetch
+        self.calls = {"fetch": 0, "list": 0}
+
+    def list(self, video_id: str):
+        self.calls["list"] += 1
+        time.sleep(self.latency)
+        if video_id not in self.videos:
+            raise FakeTranscriptNotFound(f"captions disabled for {video_id}")
+        return _FakeTranscriptList(self, self.videos[video_id])
+
+    def fetch(self, video_id: str, languages):
+        self.calls["fetch"] += 1
+        if self.fail_fetch:
+            time.sleep(self.latency)
+            raise FakeTranscriptNotFound("direct fetch disabled")
+        return self.list(video_id).find_transcript(languages).fetch()
+
+    def close(self):
+        pass
+
+
+def make_snippets(count: int, seconds: float = 4.0, topic: str = "lecture"):
+    return [{"text": f"{topic} sentence number {i}.", "start": i * seconds, "duration": seconds} for i in range(count)]
@@ -0,0 +1,67 @@
+"""Concurrency load test for the LLM endpoints.
+
+Swaps the Groq client for a fake with fixed latency and fires N concurrent
+requests at an endpoint. With a non-blocking gateway the batch should finish
+in roughly the time of a single request.
+
+    cd backend && python3 bench/load_test.py --concurrency 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from bench.fakes import FakeAsyncGroq, FakeSyncGroq  # noqa: E402
+from llm import LLMGateway  # noqa: E402
+
+TRANSCRIPT = "This lecture explains gradient descent step by step. " * 200
+
+
+async def _fire(http: httpx.AsyncClient, path: str, n: int) -> float:
+    # a distinct transcript per request keeps the artifact cache and request coalescing out of the picture
+    batch = time.perf_counter_ns()
+    bodies = [{"transcript": f"{TRANSCRIPT} [{batch}-{i}]", "language": "en"} for i in range(n)]
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(http.post(path, json=body) for body in bodies))
+    elapsed = time.perf_counter() - start
+    bad = [r.status_code for r in responses if r.status_code != 200]
+    if bad:
+        raise SystemExit(f"non-200 responses: {bad}")
+    return elapsed
+
+
+async def run(concurrency: int, latency: float, path: str, blocking: bool):
+    fake = (FakeSyncGroq if blocking else FakeAsyncGroq)(latency=latency)
+    main.client = fake
+    main.llm = LLMGateway(fake, max_concurrency=max(concurrency, 1))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        single = await _fire(http, path, 1)
+        batch = await _fire(http, path, concurrency)
+    ratio = batch / single if single else float("inf")
+    mode = "sync client + thread pool" if blocking else "async client"
+    print(f"{path} [{mode}] latency={latency:.2f}s")
+    print(f"  1 request:            {single:.3f}s")
+    print(f"  {concurrency} concurrent requests: {batch:.3f}s  ({ratio:.2f}x single, serial would be {concurrency}x)")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--path", default="/api/summary")
+    parser.add_argument("--blocking", action="store_true", help="use a synchronous fake client")
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.latency, args.path, args.blocking))
+
+
+if __name__ == "__main__":
+    main_cli()
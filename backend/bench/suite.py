@@ -0,0 +1,429 @@
+"""Reproducible benchmark and load-test suite for every backend endpoint.
+
+The Groq client and the YouTube transcript provider are swapped for local
+fakes (bench/fakes.py) with fixed latency, output speed and failure
+injection, and each scenario fires a fixed number of requests at a fixed
+concurrency through the ASGI app. Per scenario it reports p50/p95/p99
+latency, throughput, errors, fallbacks, LLM calls and memory, and writes
+everything to a JSON file so two commits can be compared:
+
+    cd backend && python3 bench/suite.py --output before.json
+    cd backend && python3 bench/suite.py --output after.json --compare before.json
+    cd backend && python3 bench/suite.py --quick --scenario summary
+
+Scenarios cover short and long transcripts, cold caches (every request
+carries new content) and warm ones (same content, generated once
+beforehand), and a 429 storm where 30% of LLM calls are rate limited.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("GROQ_API_KEY", "bench")
+# keep job state out of the working tree and independent of earlier runs
+os.environ.setdefault("JOBS_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-"), "jobs.sqlite3"))
+os.environ.pop("CACHE_DB_PATH", None)
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from bench.fakes import FakeAsyncGroq, FakeTranscriptProvider, make_snippets, smart_reply  # noqa: E402
+from llm import LLMGateway  # noqa: E402
+from metrics import FALLBACKS  # noqa: E402
+
+SHORT_SNIPPETS = 120     # ~1k tokens, well inside the truncation limits
+LONG_SNIPPETS = 2400     # ~20k tokens, several map-reduce chunks
+BATCH_VIDEOS = 10
+JOB_POLL_SECONDS = 0.02
+
+Call = Callable[[httpx.AsyncClient, str], Awaitable[Tuple[bool, Optional[float]]]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    requests: int
+    concurrency: int
+    call: Call
+    # warm scenarios send the same content every time and generate it once before timing starts
+    warm: bool = False
+    # runs before timing with every tag the scenario will use, e.g. to register transcripts
+    prepare: Optional[Callable[[httpx.AsyncClient, List[str]], Awaitable[None]]] = None
+    # FakeAsyncGroq overrides, e.g. {"rate_429": 0.3}
+    llm: Dict[str, float] = field(default_factory=dict)
+
+
+class Fixtures:
+    """Transcripts, fake video ids and transcript handles, keyed by a scenario tag"""
+
+    def __init__(self, provider: FakeTranscriptProvider):
+        self.provider = provider
+        self.videos: Dict[str, str] = {}
+        self.handles: Dict[str, str] = {}
+        self._transcripts: Dict[Tuple[str, bool], str] = {}
+
+    def snippets(self, tag: str, long: bool):
+        return make_snippets(LONG_SNIPPETS if long else SHORT_SNIPPETS, topic=tag)
+
+    def transcript(self, tag: str, long: bool = False) -> str:
+        # built once, so client-side work stays out of the measured latency
+        if (tag, long) not in self._transcripts:
+            self._transcripts[tag, long] = " ".join(s["text"] for s in self.snippets(tag, long))
+        return self._transcripts[tag, long]
+
+    def video(self, tag: str, long: bool = False) -> str:
+        if tag not in self.videos:
+            video_id = f"b{len(self.provider.videos):010d}"
+            self.provider.videos[video_id] = {"manual": {"en": self.snippets(tag, long)}}
+            self.videos[tag] = video_id
+        return self.videos[tag]
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile, so results are stable for small samples"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def fallback_total() -> float:
+    return sum(value for _, _, value in FALLBACKS.samples())
+
+
+def post(path: str, body: Callable[[str], dict], status: int = 200) -> Call:
+    async def call(http: httpx.AsyncClient, tag: str):
+        response = await http.post(path, json=body(tag))
+        return response.status_code == status, None
+    return call
+
+
+def get(path: str) -> Call:
+    async def call(http: httpx.AsyncClient, tag: str):
+        response = await http.get(path)
+        return response.status_code == 200, None
+    return call
+
+
+def stream(path: str, body: Callable[[str], dict]) -> Call:
+    """SSE request; also returns the time to the first event"""
+    async def call(http: httpx.AsyncClient, tag: str):
+        start = time.perf_counter()
+        first = None
+        ok = True
+        async with http.stream("POST", path, json=body(tag)) as response:
+            async for line in response.aiter_lines():
+                if first is None and line:
+                    first = time.perf_counter() - start
+                if line.startswith("event: error"):
+                    ok = False
+        return ok and response.status_code == 200, first
+    return call
+
+
+def background_job(body: Callable[[str], dict]) -> Call:
+    """Submit /api/process-video in background mode and poll until the job finishes"""
+    async def call(http: httpx.AsyncClient, tag: str):
+        response = await http.post("/api/process-video", json={**body(tag), "background": True})
+        if response.status_code != 202:
+            return False, None
+        job_id = response.json()["jobId"]
+        while True:
+            job = (await http.get(f"/api/jobs/{job_id}")).json()
+            if job["status"] in ("succeeded", "failed"):
+                return job["status"] == "succeeded", None
+            await asyncio.sleep(JOB_POLL_SECONDS)
+    return call
+
+
+def batch(fixtures: Fixtures) -> Call:
+    async def call(http: httpx.AsyncClient, tag: str):
+        urls = [fixtures.video(f"{tag}-{i}") for i in range(BATCH_VIDEOS)]
+        done = None
+        async with http.stream("POST", "/api/batch", json={"urls": urls}) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("data: ") and '"elapsedMs"' in line:
+                    done = json.loads(line[6:])
+        return bool(done) and done["succeeded"] == BATCH_VIDEOS, None
+    return call
+
+
+def scenarios(fixtures: Fixtures) -> List[Scenario]:
+    f = fixtures
+
+    def text(long=False, **extra):
+        return lambda tag: {"transcript": f.transcript(tag, long), "language": "en", **extra}
+
+    def url(long=False, **extra):
+        return lambda tag: {"url": f"https://www.youtube.com/watch?v={f.video(tag, long)}", "language": "en", **extra}
+
+    async def upload(http: httpx.AsyncClient, tags: List[str]):
+        for tag in tags:
+            response = await http.post("/api/transcripts", json={"transcript": f.transcript(tag, True)})
+            f.handles[tag] = response.json()["transcriptId"]
+
+    async def canonical_summaries(http: httpx.AsyncClient, tags: List[str]):
+        await asyncio.gather(*(http.post("/api/summary", json=text()(tag)) for tag in tags))
+
+    def question(tag: str) -> dict:
+        return {
+            "question": "How is the step size chosen?",
+            "video": {"title": "Lecture", "summary": "Gradient descent", "transcriptId": f.handles[tag]},
+            "history": [{"role": "user", "content": "What is a gradient?"}, {"role": "assistant", "content": "A slope."}],
+            "language": "en",
+        }
+
+    def fetch(long=False) -> Call:
+        return lambda http, tag: post(f"/api/transcript/{f.video(tag, long)}", lambda _: {})(http, tag)
+
+    def teach(tag: str) -> dict:
+        return {"summary": f.transcript(tag)[:3000], "language": "en"}
+
+    return [
+        Scenario("health", 200, 50, get("/api/health")),
+        Scenario("transcript-cold-short", 40, 10, fetch()),
+        Scenario("transcript-warm-long", 100, 20, fetch(True), warm=True),
+        Scenario("transcripts-upload-long", 50, 10, post("/api/transcripts", lambda tag: {"transcript": f.transcript(tag, True)})),
+        Scenario("summary-cold-short", 40, 10, post("/api/summary", text())),
+        Scenario("summary-warm-short", 200, 50, post("/api/summary", text()), warm=True),
+        Scenario("summary-cold-long-mapreduce", 8, 4, post("/api/summary", text(True, mode="mapreduce"))),
+        Scenario("summary-stream-cold-short", 40, 10, stream("/api/summary/stream", text())),
+        Scenario("summary-translated-from-cached", 40, 10, post("/api/summary", text(language="hi")),
+                 prepare=canonical_summaries),
+        Scenario("keypoints-cold-short", 40, 10, post("/api/keypoints", text())),
+        Scenario("questions-cold-short", 40, 10, post("/api/questions", text())),
+        Scenario("study-pack-cold-short", 40, 10, post("/api/study-pack", text())),
+        Scenario("study-pack-cold-long", 20, 5, post("/api/study-pack", text(True))),
+        Scenario("study-pack-warm-short", 200, 50, post("/api/study-pack", text()), warm=True),
+        Scenario("answer-long", 40, 10, post("/api/answer", question), prepare=upload),
+        Scenario("answer-stream-long", 40, 10, stream("/api/answer/stream", question), prepare=upload),
+        Scenario("teach", 40, 10, post("/api/teach", teach)),
+        Scenario("teach-stream", 40, 10, stream("/api/teach/stream", teach)),
+        Scenario("process-video-cold-short", 20, 5, post("/api/process-video", url())),
+        Scenario("process-video-warm-short", 100, 20, post("/api/process-video", url()), warm=True),
+        Scenario("process-video-job-cold-short", 20, 5, background_job(url())),
+        Scenario("batch-cold-short", 4, 2, batch(f)),
+        Scenario("summary-429-storm", 40, 10, post("/api/summary", text()), llm={"rate_429": 0.3}),
+        Scenario("cache-stats", 50, 10, get("/api/cache/stats")),
+        Scenario("metrics", 50, 10, get("/metrics")),
+    ]
+
+
+def install_llm(args, overrides: Dict[str, float]) -> Tuple[FakeAsyncGroq, LLMGateway]:
+    """Fresh fake client and gateway per scenario, so call and retry counts are per scenario"""
+    fake = FakeAsyncGroq(latency=args.latency, content=smart_reply, tokens_per_second=args.tokens_per_second,
+                         seed=args.seed, **overrides)
+    gateway = LLMGateway(fake, max_concurrency=64)
+    main.client = fake
+    # components built at import time hold their own reference to the gateway
+    main.llm = main.summarizer.llm = main.translator.llm = main.chat_memory.llm = gateway
+    return fake, gateway
+
+
+async def run_scenario(http: httpx.AsyncClient, scenario: Scenario, args, nonce: str) -> dict:
+    fake, gateway = install_llm(args, scenario.llm)
+    requests = max(1, scenario.requests // 5) if args.quick else scenario.requests
+    concurrency = min(scenario.concurrency, requests)
+    base = f"{scenario.name}-{nonce}"
+    tags = [base] * requests if scenario.warm else [f"{base}-{i}" for i in range(requests)]
+    if scenario.prepare:
+        await scenario.prepare(http, sorted(set(tags)))
+    if scenario.warm:
+        await scenario.call(http, base)
+    calls_before = fake.calls
+
+    latencies: List[float] = []
+    first_bytes: List[float] = []
+    errors = 0
+    pending = iter(tags)
+    fallbacks_before = fallback_total()
+
+    async def worker():
+        nonlocal errors
+        for tag in pending:
+            start = time.perf_counter()
+            try:
+                ok, first = await scenario.call(http, tag)
+            except Exception:
+                ok, first = False, None
+            latencies.append(time.perf_counter() - start)
+            if first is not None:
+                first_bytes.append(first)
+            errors += not ok
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 2)
+
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(max(latencies)),
+        "fallbacks": int(fallback_total() - fallbacks_before),
+        "llm_calls": fake.calls - calls_before,
+        "llm_retries": gateway.stats["retries"],
+        "llm_injected_failures": fake.failures,
+        "rss_mb": round(rss_mb(), 1),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    if first_bytes:
+        result["ttfb_p50_ms"] = ms(percentile(first_bytes, 50))
+        result["ttfb_p95_ms"] = ms(percentile(first_bytes, 95))
+    return result
+
+
+def git_revision() -> dict:
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], capture_output=True, text=True, timeout=10).stdout.strip()
+        except Exception:
+            return ""
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+async def run(args) -> dict:
+    provider = FakeTranscriptProvider(latency=args.fetch_latency)
+    main.transcript_engine.provider = provider
+    fixtures = Fixtures(provider)
+    selected = [s for s in scenarios(fixtures) if not args.scenario or any(p in s.name for p in args.scenario)]
+    if not selected:
+        raise SystemExit(f"No scenario matches {args.scenario}")
+    nonce = str(time.time_ns())
+    results = {}
+    # the app's own print() progress lines would drown the report
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        main.jobs.start()
+        try:
+            for scenario in selected:
+                with quiet:
+                    results[scenario.name] = await run_scenario(http, scenario, args, nonce)
+                print_row(scenario.name, results[scenario.name])
+        finally:
+            await main.jobs.stop()
+    return {
+        "meta": {
+            **git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "scenarios": results,
+    }
+
+
+def _cell(value) -> str:
+    return "-" if value is None else f"{value:.1f}" if isinstance(value, float) else str(value)
+
+
+def print_header():
+    print(f"{'scenario':<34} {'req':>4} {'conc':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>8} {'err':>4} {'fb':>4} {'llm':>5} {'retry':>5} {'rss MB':>7}")
+
+
+def print_row(name: str, r: dict):
+    print(f"{name:<34} {r['requests']:>4} {r['concurrency']:>4} {_cell(r['p50_ms']):>9} {_cell(r['p95_ms']):>9} "
+          f"{_cell(r['p99_ms']):>9} {_cell(r['throughput_rps']):>8} {r['errors']:>4} {r['fallbacks']:>4} "
+          f"{r['llm_calls']:>5} {r['llm_retries']:>5} {_cell(r['rss_mb']):>7}")
+
+
+def compare(current: dict, previous: dict, threshold: float) -> List[str]:
+    """Print p50/p95/throughput changes per scenario; returns the scenarios that regressed"""
+    regressions = []
+    print(f"\nCompared with {previous['meta'].get('commit') or 'previous run'} (regression: p95 or req/s worse by > {threshold:.0%})")
+    print(f"{'scenario':<34} {'p50 ms':>20} {'p95 ms':>20} {'req/s':>18}")
+    for name, now in current["scenarios"].items():
+        before = previous["scenarios"].get(name)
+        if not before:
+            print(f"{name:<34} (new)")
+            continue
+
+        def change(key):
+            old, new = before.get(key), now.get(key)
+            if not old or new is None:
+                return f"{_cell(old)} -> {_cell(new)}", 0.0
+            return f"{old:.1f} -> {new:.1f}", (new - old) / old
+
+        p50, _ = change("p50_ms")
+        p95, p95_change = change("p95_ms")
+        rps, rps_change = change("throughput_rps")
+        # cache hits take a few ms, where scheduling jitter alone exceeds the threshold
+        slower = p95_change > threshold and now["p95_ms"] - before["p95_ms"] > 5
+        worse = slower or rps_change < -threshold or now["errors"] > before["errors"]
+        if worse:
+            regressions.append(name)
+        print(f"{name:<34} {p50:>20} {p95:>20} {rps:>18}{'  <- regression' if worse else ''}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on regressions")
+    parser.add_argument("--scenario", action="append", help="only run scenarios whose name contains this (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="a fifth of the requests per scenario")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency before the first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=800, help="fake LLM output speed")
+    parser.add_argument("--fetch-latency", type=float, default=0.05, help="fake transcript fetch latency (s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for injected failures")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own log lines")
+    args = parser.parse_args()
+
+    print_header()
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(f"Regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main_cli()
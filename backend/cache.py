@@ -0,0 +1,410 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from scheduler import Urgency, urgency
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of a transcript (or any text) used in cache keys"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(*parts: Any) -> str:
+    return ":".join(str(p) for p in parts)
+
+
+_MISSING = object()
+
+
+class SQLiteStore:
+    """On-disk key/value tier so cached entries survive restarts and are shared by worker processes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # writers in other processes hold the lock briefly; wait for them rather than fail
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # a cache can lose its last writes on power loss; skipping the fsync per write is worth that
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            return row
+
+    def contains(self, key: str) -> bool:
+        """Whether a live entry exists, without reading its value"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone() is not None
+
+    def set(self, key: str, payload: str, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, expires_at),
+            )
+
+    def update(self, key: str, change: Callable[[Optional[str]], Optional[tuple]]):
+        """Replace the row with `change(live payload or None)`, a (payload, expires_at) pair; None keeps it.
+
+        The read and the write are one write transaction, so updates from
+        other processes sharing the file are applied one after the other.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                replacement = change(row[0] if row is not None and row[1] > time.time() else None)
+                if replacement is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, *replacement),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge(self, max_bytes: Optional[int] = None) -> int:
+        """Delete expired rows, then the soonest-expiring ones until the values fit in `max_bytes`"""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            if max_bytes is not None:
+                deleted += self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM ("
+                    "SELECT key, SUM(LENGTH(value)) OVER (ORDER BY expires_at DESC, key) AS total FROM cache"
+                    ") WHERE total > ?)",
+                    (max_bytes,),
+                ).rowcount
+            return deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """In-memory LRU with TTL and size limits, optionally backed by SQLite.
+
+    Values must be JSON-serializable, or the caller passes `dump`/`load` to
+    convert them: the memory tier keeps the value itself and only the disk
+    tier stores the serialized form. Memory misses fall through to the disk
+    tier and are promoted back into memory on a hit. With `max_entries=0`
+    only the disk tier is used, for values that other processes overwrite.
+
+    Code on the event loop uses `aget`/`aset`/`acontains`: they answer from
+    memory inline and run disk-tier reads and writes (which can wait on
+    another process's write lock) in a worker thread. A disk tier that stays
+    locked or fails counts as a miss, or a skipped write, in `disk_errors`.
+    Read-modify-write of a shared value goes through `update`/`aupdate`.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 24 * 3600, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self.disk = SQLiteStore(db_path) if db_path else None
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0,
+                      "disk_errors": 0, "purged": 0}
+
+    def get(self, key: str, load: Optional[Callable[[Any], Any]] = None) -> Optional[Any]:
+        value = self._get_memory(key)
+        if value is _MISSING and self.disk is not None:
+            value = self._get_disk(key, load)
+        return self._result(value)
+
+    async def aget(self, key: str, load: Optional[Callable[[Any], Any]] = None) -> Optional[Any]:
+        value = self._get_memory(key)
+        if value is _MISSING and self.disk is not None:
+            value = await asyncio.to_thread(self._get_disk, key, load)
+        return self._result(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, dump: Optional[Callable[[Any], Any]] = None):
+        payload, expires_at = self._set_memory(key, value, ttl, dump)
+        if self.disk is not None:
+            self._set_disk(key, payload, expires_at)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None,
+                   dump: Optional[Callable[[Any], Any]] = None):
+        payload, expires_at = self._set_memory(key, value, ttl, dump)
+        if self.disk is not None:
+            await asyncio.to_thread(self._set_disk, key, payload, expires_at)
+
+    def contains(self, key: str) -> bool:
+        """Whether `key` has a live entry; the disk tier is checked by key, without reading the value"""
+        if self._in_memory(key):
+            return True
+        return self.disk is not None and self._contains_disk(key)
+
+    async def acontains(self, key: str) -> bool:
+        if self._in_memory(key):
+            return True
+        return self.disk is not None and await asyncio.to_thread(self._contains_disk, key)
+
+    def update(self, key: str, change: Callable[[Optional[Any]], Optional[Any]],
+               ttl: Optional[float] = None) -> Optional[Any]:
+        """Store `change(current value or None)` and return it; when `change` returns None the entry is kept.
+
+        With a disk tier the read and the write run in one SQLite write
+        transaction, so processes sharing the file do not overwrite each
+        other's updates. If the disk tier fails the update is skipped
+        (counted in `disk_errors`) and None is returned.
+        """
+        if self.disk is None:
+            with self._update_lock:
+                value = change(self.get(key))
+                if value is not None:
+                    self.set(key, value, ttl)
+                return value
+        updated = None
+
+        def change_payload(payload: Optional[str]) -> Optional[tuple]:
+            nonlocal updated
+            updated = change(None if payload is None else json.loads(payload))
+            return None if updated is None else self._set_memory(key, updated, ttl, None)
+
+        try:
+            self.disk.update(key, change_payload)
+        except sqlite3.Error:
+            with self._lock:
+                if key in self._entries:
+                    self._drop(key)
+            self._disk_error()
+            return None
+        return updated
+
+    async def aupdate(self, key: str, change: Callable[[Optional[Any]], Optional[Any]],
+                      ttl: Optional[float] = None) -> Optional[Any]:
+        return await asyncio.to_thread(self.update, key, change, ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    async def purge(self, max_bytes: Optional[int] = None) -> int:
+        """Drop expired disk rows, and the soonest-expiring ones beyond `max_bytes`.
+
+        Expired rows are otherwise only removed when their key is read again,
+        and most content-hash keys never are. Caches sharing a database file
+        share its table, so purging through any of them covers all.
+        """
+        if self.disk is None:
+            return 0
+        try:
+            deleted = await asyncio.to_thread(self.disk.purge, max_bytes)
+        except sqlite3.Error:
+            self._disk_error()
+            return 0
+        with self._lock:
+            self.stats["purged"] += deleted
+        return deleted
+
+    def _get_memory(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at, size = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return value
+            self._drop(key)
+            self.stats["expired"] += 1
+            return _MISSING
+
+    def _get_disk(self, key: str, load: Optional[Callable[[Any], Any]]) -> Any:
+        try:
+            row = self.disk.get(key)
+        except sqlite3.Error:
+            self._disk_error()
+            return _MISSING
+        if row is None:
+            return _MISSING
+        value = json.loads(row[0])
+        if load is not None:
+            value = load(value)
+        with self._lock:
+            self._store(key, value, row[1], len(row[0]))
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+        return value
+
+    def _set_disk(self, key: str, payload: str, expires_at: float):
+        try:
+            self.disk.set(key, payload, expires_at)
+        except sqlite3.Error:
+            self._disk_error()
+
+    def _contains_disk(self, key: str) -> bool:
+        try:
+            return self.disk.contains(key)
+        except sqlite3.Error:
+            self._disk_error()
+            return False
+
+    def _disk_error(self):
+        with self._lock:
+            self.stats["disk_errors"] += 1
+
+    def _result(self, value: Any) -> Optional[Any]:
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _set_memory(self, key: str, value: Any, ttl: Optional[float], dump: Optional[Callable[[Any], Any]]) -> tuple:
+        payload = json.dumps(value if dump is None else dump(value), ensure_ascii=False)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at, len(payload))
+        return payload, expires_at
+
+    def _in_memory(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.time()
+
+    def _store(self, key: str, value: Any, expires_at: float, size: int):
+        if key in self._entries:
+            self._drop(key)
+        if size > self.max_bytes or not self.max_entries:
+            return
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def _drop(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "disk": self.disk.path if self.disk else None,
+            }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+# True while running work nobody has asked for yet (see prefetch.py); copied into tasks it spawns
+speculative: ContextVar[bool] = ContextVar("speculative", default=False)
+
+
+class SingleFlight:
+    """Coalesce concurrent identical work so callers share one in-flight task.
+
+    The shared task is shielded, so a caller that disconnects does not cancel
+    the work for everyone else waiting on the same key. The exception is
+    speculative work: while only speculative callers wait on a task, the
+    last of them leaving cancels it. A real caller joining makes it a
+    normal task that runs to completion.
+
+    Callers pass the scheduler priority they would have used themselves;
+    a more urgent one joining raises the task's Urgency, which moves the
+    LLM calls it has queued up to that lane.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self._speculative: Set[asyncio.Future] = set()
+        self._urgency: Dict[asyncio.Future, Urgency] = {}
+        self.stats = {"leaders": 0, "followers": 0, "cancelled": 0, "promoted": 0}
+
+    def _done(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        self._speculative.discard(task)
+        self._urgency.pop(task, None)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]], priority: Optional[int] = None) -> Any:
+        # work done for another shared task is as urgent as that task
+        outer = urgency.get()
+        if outer is not None and outer.priority is not None:
+            priority = outer.priority if priority is None else min(priority, outer.priority)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["followers"] += 1
+            if not speculative.get():
+                self._speculative.discard(task)
+            shared = self._urgency[task]
+            if priority is not None and shared.raise_to(priority):
+                self.stats["promoted"] += 1
+        else:
+            shared = Urgency(priority)
+            token = urgency.set(shared)
+            try:
+                task = asyncio.ensure_future(factory())
+            finally:
+                urgency.reset(token)
+            self._inflight[key] = task
+            self._urgency[task] = shared
+            if speculative.get():
+                self._speculative.add(task)
+            task.add_done_callback(lambda _: self._done(key, task))
+            self.stats["leaders"] += 1
+        if outer is not None:
+            outer.listen(shared.raise_to)
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task in self._speculative and self._waiters[task] == 1 and not task.done():
+                self.stats["cancelled"] += 1
+                task.cancel()
+            raise
+        finally:
+            if outer is not None:
+                outer.unlisten(shared.raise_to)
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def pending(self, key: str) -> bool:
+        return key in self._inflight
+
+    def inflight(self) -> int:
+        return len(self._inflight)
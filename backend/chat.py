@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import uuid
+from typing import Dict, List, Optional
+
+from cache import TieredCache, make_key
+from llm import LLMGateway
+from scheduler import PRIORITY_BULK
+from tracing import log_event
+from transcripts import estimate_tokens
+
+
+def clip(text: str, tokens: int) -> str:
+    """`text` cut to roughly `tokens` tokens"""
+    text = str(text).strip()
+    limit = tokens * 4
+    return text if len(text.encode("utf-8")) <= limit else text.encode("utf-8")[:limit].decode("utf-8", "ignore") + "…"
+
+
+def _turn(role: str, content: str) -> dict:
+    return {"role": "user" if role == "user" else "assistant", "content": str(content).strip()}
+
+
+def format_turn(turn: dict, tokens: int) -> str:
+    role = "Student" if turn["role"] == "user" else "Tutor"
+    return f"{role}: {clip(turn['content'], tokens)}"
+
+
+class ChatMemory:
+    """Server-side chat sessions whose prompt context has a fixed size.
+
+    Each session belongs to one video. The last `recent_turns` turns are
+    kept verbatim (within `history_tokens`); once `fold_batch` more have
+    piled up behind them, they are folded into a rolling summary of at
+    most `summary_tokens` by a bulk-priority completion that runs after the
+    answer has been sent. The history part of a prompt therefore stays the
+    same size however long the conversation runs, and the fold never adds
+    latency to a turn.
+    """
+
+    def __init__(self, llm: LLMGateway, store: TieredCache, recent_turns: int = 6, history_tokens: int = 1200,
+                 summary_tokens: int = 300, turn_tokens: int = 150, fold_batch: int = 4):
+        self.llm = llm
+        self.store = store
+        self.recent_turns = recent_turns
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+        self.fold_batch = fold_batch
+        self._folds: Dict[str, asyncio.Task] = {}
+        self.stats = {"sessions": 0, "turns": 0, "folds": 0, "fold_failures": 0, "dropped_turns": 0}
+
+    def _key(self, session_id: str) -> str:
+        return make_key("chat", session_id)
+
+    async def session(self, session_id: Optional[str], video_key: str, history: Optional[List[dict]] = None) -> dict:
+        """The stored session, or a new one for `video_key` seeded from the client's history"""
+        if session_id:
+            stored = await self.store.aget(self._key(session_id))
+            if stored is not None and stored["video"] == video_key:
+                return stored
+        turns = [_turn(t.get("role"), t.get("content", "")) for t in history or [] if str(t.get("content", "")).strip()]
+        session = {"id": uuid.uuid4().hex, "video": video_key, "summary": "", "turns": turns, "folded": 0}
+        self.stats["sessions"] += 1
+        await self.store.aset(self._key(session["id"]), session)
+        self._maybe_fold(session)
+        return session
+
+    def context(self, session: dict) -> str:
+        """Rolling summary plus the most recent turns that fit the history budget"""
+        lines, budget = [], self.history_tokens
+        for turn in reversed(session["turns"][-self.recent_turns:]):
+            line = format_turn(turn, self.turn_tokens)
+            budget -= estimate_tokens(line)
+            if budget < 0:
+                break
+            lines.append(line)
+        lines.reverse()
+        if session["summary"]:
+            lines.insert(0, f"(Earlier in this conversation) {session['summary']}")
+        return "\n".join(lines)
+
+    def last_question(self, session: dict) -> str:
+        return next((t["content"] for t in reversed(session["turns"]) if t["role"] == "user"), "")
+
+    async def record(self, session: dict, question: str, answer: str):
+        """Append a finished exchange and fold older turns in the background when enough have piled up"""
+        # re-read and written back in one store transaction: a fold, or another worker's turn in the
+        # same session, may have finished while the answer was being generated
+        updated = await self.store.aupdate(self._key(session["id"]),
+                                           lambda current: self._append(current or session, question, answer))
+        self.stats["turns"] += 1
+        if updated is not None:
+            self._maybe_fold(updated)
+
+    def _append(self, current: dict, question: str, answer: str) -> dict:
+        turns = current["turns"] + [_turn("user", question), _turn("assistant", answer)]
+        # if folds keep failing, drop the oldest turns rather than let the session grow without bound
+        limit = self.recent_turns + 4 * self.fold_batch
+        if len(turns) > limit:
+            self.stats["dropped_turns"] += len(turns) - limit
+            turns = turns[-limit:]
+        return {**current, "turns": turns}
+
+    def _maybe_fold(self, session: dict):
+        sid = session["id"]
+        if len(session["turns"]) - self.recent_turns < self.fold_batch or sid in self._folds:
+            return
+        task = asyncio.ensure_future(self._fold(sid))
+        self._folds[sid] = task
+        task.add_done_callback(lambda _: self._folds.pop(sid, None))
+
+    async def _fold(self, session_id: str):
+        key = self._key(session_id)
+        session = await self.store.aget(key)
+        if session is None:
+            return
+        older = session["turns"][:-self.recent_turns]
+        transcript = "\n".join(format_turn(turn, self.turn_tokens) for turn in older)
+        prompt = f"""
+You keep the running memory of a tutoring conversation about one video.
+Update the summary with the new turns: what the student asked, what was explained, and anything they struggled with or want next.
+Keep it under {self.summary_tokens * 3 // 4} words, in the language of the conversation. Return only the updated summary.
+
+Current summary:
+{session["summary"] or "(empty)"}
+
+New turns:
+{transcript}
+"""
+        try:
+            summary = await self.llm.complete(prompt, max_tokens=self.summary_tokens, temperature=0.3,
+                                              priority=PRIORITY_BULK, task="chat-fold")
+        except Exception as e:
+            self.stats["fold_failures"] += 1
+            log_event("chat_fold_failed", logging.WARNING, session_id=session_id, error=repr(e))
+            return
+        summary = clip(summary, self.summary_tokens)
+        if await self.store.aupdate(key, lambda current: self._apply_fold(current, older, summary)) is not None:
+            self.stats["folds"] += 1
+
+    def _apply_fold(self, current: Optional[dict], older: List[dict], summary: str) -> Optional[dict]:
+        if current is None:
+            return None
+        # turns recorded while the fold ran stay verbatim
+        remaining = current["turns"][len(older):] if current["turns"][:len(older)] == older else current["turns"]
+        return {
+            **current,
+            "summary": summary,
+            "turns": remaining,
+            "folded": current["folded"] + len(current["turns"]) - len(remaining),
+        }
+
+    async def close(self):
+        tasks = list(self._folds.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,122 @@
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+from metrics import RESPONSE_BYTES
+
+# Already compressed, or must reach the client chunk by chunk
+SKIP_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+def accepted_encoding(header: str, brotli_available: bool = brotli is not None) -> Optional[str]:
+    """Best encoding from an Accept-Encoding header: br, then gzip, else None"""
+    weights = {}
+    for item in header.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    candidates = (["br"] if brotli_available else []) + ["gzip"]
+    for name in candidates:
+        if weights.get(name, weights.get("*", 0.0)) > 0:
+            return name
+    return None
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress, self._flush, self._finish = (
+                self._compressor.process, self._compressor.flush, self._compressor.finish
+            )
+        else:
+            # wbits=31: gzip container
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        out = self._compress(data)
+        # flush each chunk of a streamed body so the client is not kept waiting on the compressor
+        return out + (self._finish() if last else self._flush())
+
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip for response bodies of at least `minimum_size` bytes.
+
+    Plain ASGI so streamed bodies are compressed chunk by chunk instead of
+    buffered. Server-sent events and responses that already carry a
+    Content-Encoding pass through untouched. Bytes on the wire are counted
+    per encoding in http_response_bytes_total.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        encoding = accepted_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        start = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                response_headers = dict(message.get("headers") or [])
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = (
+                    encoding is None
+                    or b"content-encoding" in response_headers
+                    or content_type.startswith(SKIP_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if passthrough:
+                RESPONSE_BYTES.inc(len(body), encoding="identity")
+                return await send(message)
+            if start is not None:
+                # first body message decides: a small complete body is not worth compressing
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    start = None
+                    RESPONSE_BYTES.inc(len(body), encoding="identity")
+                    return await send(message)
+                encoder = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+                original = start.get("headers") or []
+                vary = b", ".join([v for k, v in original if k == b"vary"] + [b"Accept-Encoding"])
+                response_headers = [(k, v) for k, v in original if k not in (b"content-length", b"vary")]
+                response_headers += [(b"content-encoding", encoding.encode()), (b"vary", vary)]
+                data = encoder.chunk(body, not more)
+                if not more:
+                    response_headers.append((b"content-length", str(len(data)).encode()))
+                await send({**start, "headers": response_headers})
+                start = None
+            else:
+                data = encoder.chunk(body, not more)
+            RESPONSE_BYTES.inc(len(data), encoding=encoding)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
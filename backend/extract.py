@@ -0,0 +1,357 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+
+from metrics import JSON_REPAIRS
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+_MISSING = object()
+_FENCE = re.compile(r"```[a-zA-Z]*[ \t]*\n?")
+_OPEN = re.compile(r"[{\[]")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_WORD = re.compile(r"[A-Za-z_][\w-]*")
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+
+class _Scanner:
+    """Recursive-descent JSON reader that stops instead of failing.
+
+    On a truncated reply or a defect it cannot repair it returns what was
+    complete so far: closed strings and numbers, and the containers holding
+    them. Repairs trailing and missing commas, single quotes, unquoted keys,
+    raw newlines in strings and Python literals.
+    """
+
+    def __init__(self, text: str, pos: int):
+        self.text = text
+        self.pos = pos
+        self.stopped = False
+        self.defects = set()
+
+    def _stop(self, defect: str):
+        self.stopped = True
+        self.defects.add(defect)
+        return _MISSING
+
+    def _skip_ws(self):
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def value(self):
+        self._skip_ws()
+        if self.pos >= len(self.text):
+            return self._stop("truncated")
+        ch = self.text[self.pos]
+        if ch == "{":
+            return self._container("}")
+        if ch == "[":
+            return self._container("]")
+        if ch in "\"'":
+            return self._string(ch)
+        if ch == "-" or ch.isdigit():
+            return self._number()
+        return self._literal()
+
+    def _string(self, quote: str):
+        chars, i, escape = [], self.pos + 1, False
+        while i < len(self.text):
+            ch = self.text[i]
+            if escape:
+                # \' is only valid inside single-quoted strings
+                chars.append(ch if ch == "'" else "\\" + ch)
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == quote:
+                self.pos = i + 1
+                raw = "".join(chars)
+                if quote == "'":
+                    self.defects.add("syntax")
+                try:
+                    return json.loads(f'"{raw}"')
+                except ValueError:
+                    self.defects.add("syntax")
+                    return raw.replace("\\n", "\n").replace("\\", "")
+            elif ch in "\n\r\t":
+                self.defects.add("syntax")
+                chars.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[ch])
+            else:
+                chars.append('\\"' if ch == '"' else ch)
+            i += 1
+        # an unterminated string is dropped rather than kept half-written
+        return self._stop("truncated")
+
+    def _number(self):
+        match = _NUMBER.match(self.text, self.pos)
+        if not match:
+            return self._stop("syntax")
+        if match.end() >= len(self.text):
+            # more digits may follow in the next delta
+            return self._stop("truncated")
+        self.pos = match.end()
+        return json.loads(match.group(0))
+
+    def _literal(self):
+        match = _WORD.match(self.text, self.pos)
+        if match and match.group(0) in _LITERALS:
+            if match.group(0) not in ("true", "false", "null"):
+                self.defects.add("syntax")
+            self.pos = match.end()
+            return _LITERALS[match.group(0)]
+        if match and match.end() >= len(self.text) and any(w.startswith(match.group(0)) for w in _LITERALS):
+            return self._stop("truncated")
+        return self._stop("syntax")
+
+    def _key(self):
+        ch = self.text[self.pos]
+        if ch in "\"'":
+            return self._string(ch)
+        match = _WORD.match(self.text, self.pos)
+        if not match:
+            return self._stop("syntax")
+        self.defects.add("syntax")
+        self.pos = match.end()
+        return match.group(0)
+
+    def _container(self, close: str):
+        is_object = close == "}"
+        result: Any = {} if is_object else []
+        self.pos += 1
+        after_comma = False
+        while True:
+            self._skip_ws()
+            if self.pos >= len(self.text):
+                self._stop("truncated")
+                return result
+            ch = self.text[self.pos]
+            if ch == close:
+                if after_comma:
+                    self.defects.add("syntax")
+                self.pos += 1
+                return result
+            if ch == ",":
+                after_comma = True
+                self.pos += 1
+                continue
+            if result and not after_comma:
+                self.defects.add("syntax")
+            after_comma = False
+            if is_object:
+                key = self._key()
+                if key is _MISSING:
+                    return result
+                self._skip_ws()
+                if self.pos >= len(self.text):
+                    self._stop("truncated")
+                    return result
+                if self.text[self.pos] != ":":
+                    self._stop("syntax")
+                    return result
+                self.pos += 1
+            item = self.value()
+            if item is _MISSING:
+                return result
+            if is_object:
+                result[str(key)] = item
+            else:
+                result.append(item)
+            if self.stopped:
+                return result
+
+
+def extract_json(raw: str) -> Optional[Any]:
+    """Largest valid JSON value in a model reply, or None.
+
+    Tolerates code fences, prose around the JSON and the defects listed on
+    _Scanner. Safe to call on a partial stream: a truncated reply yields
+    the fields that were complete. Every bracket outside an already scanned
+    value is tried as a start, and the one that reads the longest stretch
+    of text wins, so brackets in the prose ("[4 total]", "{video}") do not
+    hide the JSON after them.
+    """
+    text = raw.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    fence = _FENCE.search(text)
+    offset = fence.end() if fence else 0
+    best = None
+    scanned_to = offset
+    for match in _OPEN.finditer(text, offset):
+        start = match.start()
+        if start < scanned_to:
+            # nested in a value already read, so shorter than it
+            continue
+        candidate = _Scanner(text, start)
+        candidate_value = candidate.value()
+        scanned_to = max(candidate.pos, start + 1)
+        if candidate_value is not _MISSING and (best is None or candidate.pos - start > best[2].pos - best[1]):
+            best = (candidate_value, start, candidate)
+    if best is None:
+        return None
+    value, start, scanner = best
+    tail = text[scanner.pos:] if not scanner.stopped else ""
+    if _FENCE.sub("", text[:start] + tail).strip():
+        scanner.defects.add("prose")
+    for defect in scanner.defects:
+        JSON_REPAIRS.inc(defect=defect)
+    return value
+
+
+def bullet_lines(raw: str) -> List[str]:
+    """Non-empty lines of a plain-text list reply, without bullet markers"""
+    return [line.strip().lstrip("-*•").strip() for line in raw.split("\n") if line.strip().lstrip("-*•").strip()]
+
+
+def _clean_strings(value) -> List[str]:
+    return [v.strip() for v in value or [] if isinstance(v, str) and v.strip()]
+
+
+class Section(BaseModel):
+    heading: str
+    bullets: List[str] = []
+    paragraphs: List[str] = []
+
+    @field_validator("bullets", "paragraphs", mode="before")
+    @classmethod
+    def _lists(cls, value):
+        return _clean_strings(value)
+
+
+class Summary(BaseModel):
+    title: str = "Summary"
+    paragraphs: List[str] = []
+    bullets: List[str] = []
+    sections: List[Section] = []
+
+    @field_validator("paragraphs", "bullets", mode="before")
+    @classmethod
+    def _lists(cls, value):
+        return _clean_strings(value)
+
+    @field_validator("title", mode="before")
+    @classmethod
+    def _title(cls, value):
+        return str(value).strip() if value else "Summary"
+
+    @field_validator("sections", mode="before")
+    @classmethod
+    def _sections(cls, value):
+        return [s for s in value or [] if isinstance(s, dict) and s.get("heading")]
+
+    @model_validator(mode="after")
+    def _has_content(self):
+        if not (self.paragraphs or self.bullets or self.sections):
+            raise ValueError("summary has no content")
+        return self
+
+    def public(self) -> dict:
+        return self.model_dump(exclude={"sections"} if not self.sections else None)
+
+
+class KeyPoint(BaseModel):
+    id: str
+    text: str
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def _id(cls, value):
+        return str(value)
+
+    @field_validator("text", mode="before")
+    @classmethod
+    def _text(cls, value):
+        text = str(value).strip().strip("-*•\t ")
+        if not text:
+            raise ValueError("empty key point")
+        return text
+
+    def public(self) -> dict:
+        return self.model_dump()
+
+
+class Question(BaseModel):
+    id: str
+    question: str
+    answer: str
+    difficulty: str = "medium"
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def _id(cls, value):
+        return str(value)
+
+    @field_validator("question", "answer", mode="before")
+    @classmethod
+    def _required(cls, value):
+        text = str(value or "").strip()
+        if not text:
+            raise ValueError("empty")
+        return text
+
+    @field_validator("difficulty", mode="before")
+    @classmethod
+    def _difficulty(cls, value):
+        difficulty = str(value or "").strip().lower()
+        return difficulty if difficulty in DIFFICULTIES else "medium"
+
+    def public(self) -> dict:
+        return self.model_dump()
+
+
+# Schema per part; list parts are validated item by item so one bad item does not discard the rest
+SCHEMAS: Dict[str, Type[BaseModel]] = {"summary": Summary, "keyPoints": KeyPoint, "questions": Question}
+LIST_PARTS = frozenset({"keyPoints", "questions"})
+
+
+def validate_part(part: str, value) -> Optional[Any]:
+    """`value` normalized to the schema of `part`, or None if nothing in it is usable"""
+    schema = SCHEMAS[part]
+    if part not in LIST_PARTS:
+        if isinstance(value, dict) and isinstance(value.get(part), dict):
+            # tolerate a doubly wrapped {"summary": {"summary": {...}}}
+            value = value[part]
+        try:
+            return schema.model_validate(value).public()
+        except ValidationError:
+            return None
+    if not isinstance(value, list):
+        return None
+    items = []
+    for idx, item in enumerate(value, start=1):
+        if isinstance(item, dict) and "id" not in item:
+            item = {**item, "id": idx}
+        elif isinstance(item, str):
+            item = {"id": idx, "text": item}
+        try:
+            items.append(schema.model_validate(item).public())
+        except ValidationError:
+            continue
+    return items or None
+
+
+def extract_parts(raw: str, parts: List[str]) -> Dict[str, Any]:
+    """Each requested part found and valid in the reply; parts that are missing or invalid are left out.
+
+    A reply that is a bare object or array is taken as the single part
+    asked for, and a plain bullet list counts as keyPoints.
+    """
+    data = extract_json(raw)
+    if len(parts) == 1:
+        part = parts[0]
+        if data is None and part == "keyPoints":
+            data = bullet_lines(raw)
+        if isinstance(data, list) or (isinstance(data, dict) and part not in data):
+            data = {part: data}
+    if not isinstance(data, dict):
+        return {}
+    valid = {}
+    for part in parts:
+        value = validate_part(part, data.get(part))
+        if value is not None:
+            valid[part] = value
+    return valid
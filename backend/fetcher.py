@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from cache import TieredCache, make_key
+from tracing import log_event, span
+from transcripts import SegmentStore
+
+NO_TRANSCRIPT = "none"
+
+# HTTP connections per session, and threads running strategies: one connection per thread
+POOL_SIZE = 32
+
+
+def make_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """One pooled HTTP session shared by every transcript fetch"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class YouTubeTranscriptProvider:
+    """youtube-transcript-api behind a shared requests session.
+
+    Supports the 1.x instance API (fetch/list) and the 0.6.x class API,
+    where the session is passed to the internal list fetcher.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.session = session or make_session()
+        try:
+            self._api = YouTubeTranscriptApi(http_client=self.session)
+        except TypeError:
+            self._api = None
+
+    def list(self, video_id: str):
+        if self._api is not None and hasattr(self._api, "list"):
+            return self._api.list(video_id)
+        from youtube_transcript_api._transcripts import TranscriptListFetcher
+        return TranscriptListFetcher(self.session).fetch(video_id)
+
+    def fetch(self, video_id: str, languages: List[str]):
+        if self._api is not None and hasattr(self._api, "fetch"):
+            return self._api.fetch(video_id, languages=languages)
+        return self.list(video_id).find_transcript(languages).fetch()
+
+    def close(self):
+        self.session.close()
+
+
+class _Attempt:
+    """State shared by the strategies of one fetch, so the transcript list is downloaded once"""
+
+    def __init__(self, provider, video_id: str):
+        self.provider = provider
+        self.video_id = video_id
+        self._lock = threading.Lock()
+        self._listing = None
+
+    def listing(self):
+        with self._lock:
+            if self._listing is None:
+                self._listing = self.provider.list(self.video_id)
+            return self._listing
+
+
+# Same order as the original fallback chain; each returns raw snippets
+STRATEGIES: List[Tuple[str, Callable]] = [
+    ("en", lambda a: a.provider.fetch(a.video_id, ["en"])),
+    ("alt-languages", lambda a: a.provider.fetch(a.video_id, ["hi", "en-US", "en-GB"])),
+    ("listed-en", lambda a: a.listing().find_transcript(["en"]).fetch()),
+    ("generated-en", lambda a: a.listing().find_generated_transcript(["en"]).fetch()),
+]
+
+
+class TranscriptFetchEngine:
+    """Hedged, memoized transcript fetching.
+
+    Strategies start in order; the next one is launched when the previous
+    fails or has not answered within `hedge_delay`, and the first success
+    wins. The winning strategy is remembered per video so repeat fetches
+    go straight to it, and videos with no transcript at all are remembered
+    for `negative_ttl` seconds.
+
+    Strategies block, so they run on the engine's own thread pool rather
+    than the loop's default executor, and the hedge delay is measured from
+    when a thread picks a strategy up, not from when it was queued.
+    """
+
+    def __init__(self, provider, memo: TieredCache, hedge_delay: float = 0.75,
+                 positive_ttl: float = 7 * 24 * 3600, negative_ttl: float = 600, max_workers: int = POOL_SIZE):
+        self.provider = provider
+        self.memo = memo
+        self.hedge_delay = hedge_delay
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.stats = {"fetches": 0, "memo_hits": 0, "negative_hits": 0, "attempts": 0, "failures": 0}
+        # a hedge that loses keeps its thread until the blocking call returns; this bounds how many can
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="transcript")
+
+    def _memo_key(self, video_id: str) -> str:
+        return make_key("strategy", video_id)
+
+    async def _run(self, name: str, strategy: Callable, attempt: _Attempt, started: asyncio.Event) -> Tuple[str, SegmentStore]:
+        loop = asyncio.get_running_loop()
+        began = 0.0
+
+        def fetch() -> SegmentStore:
+            nonlocal began
+            began = time.perf_counter()
+            loop.call_soon_threadsafe(started.set)
+            return SegmentStore.from_snippets(strategy(attempt))
+
+        self.stats["attempts"] += 1
+        with span("transcript.strategy", strategy=name, video_id=attempt.video_id):
+            store = await loop.run_in_executor(self._executor, fetch)
+            if not store.text:
+                raise ValueError("empty transcript")
+        log_event("transcript_fetched", strategy=name, video_id=attempt.video_id, segments=len(store),
+                  duration_ms=round((time.perf_counter() - began) * 1000, 1))
+        return name, store
+
+    async def _hedged(self, strategies: List[Tuple[str, Callable]], attempt: _Attempt) -> Optional[Tuple[str, SegmentStore]]:
+        pending = set()
+        remaining = list(strategies)
+        try:
+            while remaining or pending:
+                if remaining:
+                    name, strategy = remaining.pop(0)
+                    started = asyncio.Event()
+                    pending.add(asyncio.ensure_future(self._run(name, strategy, attempt, started)))
+                    if remaining:
+                        # the hedge clock starts when a thread picks the strategy up, not while it waits for one
+                        waiter = asyncio.ensure_future(started.wait())
+                        await asyncio.wait(pending | {waiter}, return_when=asyncio.FIRST_COMPLETED)
+                        waiter.cancel()
+                # wait for a result, but only up to the hedge delay while more strategies are queued
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                # retrieve every exception before picking a winner, so none is reported as unhandled
+                failed = [task for task in done if task.exception() is not None]
+                for task in failed:
+                    self.stats["failures"] += 1
+                    log_event("transcript_strategy_failed", logging.WARNING, video_id=attempt.video_id, error=repr(task.exception()))
+                for task in done:
+                    if task not in failed:
+                        return task.result()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch(self, video_id: str) -> Optional[SegmentStore]:
+        """Timed transcript for a video, or None when no strategy can find one"""
+        self.stats["fetches"] += 1
+        key = self._memo_key(video_id)
+        remembered = await self.memo.aget(key)
+        if remembered == NO_TRANSCRIPT:
+            self.stats["negative_hits"] += 1
+            return None
+        attempt = _Attempt(self.provider, video_id)
+        strategies = STRATEGIES
+        if remembered is not None:
+            known = [s for s in STRATEGIES if s[0] == remembered]
+            if known:
+                self.stats["memo_hits"] += 1
+                result = await self._hedged(known, attempt)
+                if result is not None:
+                    return result[1]
+                strategies = [s for s in STRATEGIES if s[0] != remembered]
+        result = await self._hedged(strategies, attempt)
+        if result is None:
+            await self.memo.aset(key, NO_TRANSCRIPT, ttl=self.negative_ttl)
+            return None
+        await self.memo.aset(key, result[0], ttl=self.positive_ttl)
+        return result[1]
+
+    def close(self):
+        # strategies still queued are dropped; running ones finish on their own
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.provider.close()
@@ -0,0 +1,409 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import httpx
+
+from tracing import log_event
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+# progress(stage, partial_result) is handed to the job runner
+Progress = Callable[[str, Dict[str, Any]], None]
+Runner = Callable[[Dict[str, Any], Progress], Awaitable[Dict[str, Any]]]
+
+
+class JobStore:
+    """SQLite-backed job records, so queued and finished jobs survive a restart"""
+
+    COLUMNS = ("id", "dedup_key", "status", "stage", "payload", "result", "error", "webhook", "created_at", "updated_at")
+    JSON_COLUMNS = ("payload", "result")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        """Create or open the database file; JobQueue.start calls this, so importing opens nothing"""
+        with self._lock:
+            if self._conn is not None:
+                return
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, dedup_key TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, "
+                "payload TEXT NOT NULL, result TEXT, error TEXT, webhook TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status)")
+
+    def _row(self, row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        for column in self.JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] else {}
+        return job
+
+    def _insert(self, dedup_key: str, payload: dict, webhook: Optional[str]) -> str:
+        now = time.time()
+        job_id = f"job_{uuid.uuid4().hex[:20]}"
+        self._conn.execute(
+            "INSERT INTO jobs (id, dedup_key, status, stage, payload, result, error, webhook, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?, ?)",
+            (job_id, dedup_key, QUEUED, QUEUED, json.dumps(payload), "{}", webhook, now, now),
+        )
+        return job_id
+
+    def create(self, dedup_key: str, payload: dict, webhook: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            job_id = self._insert(dedup_key, payload, webhook)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row(row)
+
+    def _find(self, dedup_key: str, reuse_after: float):
+        return self._conn.execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE dedup_key = ? "
+            "AND (status IN (?, ?) OR (status = ? AND updated_at >= ?)) ORDER BY created_at DESC LIMIT 1",
+            (dedup_key, QUEUED, RUNNING, SUCCEEDED, reuse_after),
+        ).fetchone()
+
+    def find(self, dedup_key: str, reuse_after: float) -> Optional[Dict[str, Any]]:
+        """Unfinished job for the key, or one that succeeded since `reuse_after`"""
+        with self._lock:
+            row = self._find(dedup_key, reuse_after)
+        return self._row(row)
+
+    def find_or_create(self, dedup_key: str, payload: dict, reuse_after: float,
+                       webhook: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """The job find() returns, or a new queued one; second item is True when it already existed.
+
+        Both steps run in one write transaction, so processes submitting the
+        same key at once get the same job.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._find(dedup_key, reuse_after)
+                job_id = None if row is not None else self._insert(dedup_key, payload, webhook)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is not None:
+            return self._row(row), True
+        return self.get(job_id), False
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        for column in self.JSON_COLUMNS:
+            if column in fields:
+                fields[column] = json.dumps(fields[column], ensure_ascii=False)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Mark a queued job running and return it; None if another worker got there first"""
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, RUNNING, time.time(), job_id, QUEUED),
+            ).rowcount
+        return self.get(job_id) if claimed else None
+
+    def touch(self, job_ids: List[str]):
+        """Renew the lease on running jobs"""
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE status = ? AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time(), RUNNING, *job_ids),
+            )
+
+    def expire_leases(self, older_than: float) -> int:
+        """Re-queue running jobs whose lease was last renewed before `older_than` (their process died)"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ? WHERE status = ? AND updated_at < ?",
+                (QUEUED, QUEUED, RUNNING, older_than),
+            ).rowcount
+
+    def requeue(self, job_ids: List[str]):
+        """Put running jobs back in the queue, e.g. when their process shuts down"""
+        with self._lock:
+            for job_id in job_ids:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, stage = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (QUEUED, QUEUED, time.time(), job_id, RUNNING),
+                )
+
+    def queued(self, before: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? AND updated_at < ? ORDER BY created_at", (QUEUED, before)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (SUCCEEDED, FAILED, older_than)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+async def webhook_error(url: str, allowed_hosts: Sequence[str] = ()) -> Optional[str]:
+    """Why the server must not POST to this webhook URL, or None when it may.
+
+    With an allowlist, only those hosts are accepted (an entry starting with
+    "." also matches subdomains) and they are trusted as configured. Without
+    one, every address the host resolves to must be public, so a webhook
+    cannot reach loopback, private or link-local (cloud metadata) addresses.
+    """
+    try:
+        parsed = httpx.URL(url)
+    except Exception:
+        return "webhook must be an http(s) URL"
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        return "webhook must be an http(s) URL"
+    host = parsed.host.lower().rstrip(".")
+    if allowed_hosts:
+        if any(host == allowed or (allowed.startswith(".") and host.endswith(allowed)) for allowed in allowed_hosts):
+            return None
+        return f"webhook host {host} is not allowed"
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return f"webhook host {host} does not resolve"
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            return "webhook must resolve to a public address"
+    return None
+
+
+class JobQueue:
+    """Bounded worker pool running jobs from a JobStore.
+
+    Submissions are deduplicated by key: while a job for the same key is
+    queued or running (or finished successfully within `reuse_seconds`) the
+    existing job is returned instead of starting new work. Workers report
+    stage progress and partial results to the store and to live subscribers,
+    and POST the final job to its webhook, if any. Webhooks are checked
+    with `webhook_error` again right before delivery, since DNS may have
+    changed since the job was submitted; redirects are not followed.
+
+    Several processes can share one store: a job is claimed atomically
+    before it runs, and running jobs hold a lease of `lease_seconds` that
+    their process renews. On start a process queues every waiting job;
+    after that it also picks up jobs whose lease ran out (their process
+    died) and jobs another process has left waiting longer than the lease.
+    Stopping re-queues the jobs that were still running.
+    """
+
+    def __init__(self, store: JobStore, runner: Runner, workers: int = 4, reuse_seconds: float = 3600,
+                 retention_seconds: float = 7 * 24 * 3600, webhook_timeout: float = 10.0, lease_seconds: float = 60.0,
+                 webhook_hosts: Sequence[str] = ()):
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.reuse_seconds = reuse_seconds
+        self.retention_seconds = retention_seconds
+        self.webhook_timeout = webhook_timeout
+        self.lease_seconds = lease_seconds
+        self.webhook_hosts = webhook_hosts
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running: Set[str] = set()
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._http: Optional[httpx.AsyncClient] = None
+        self.stats = {"submitted": 0, "deduplicated": 0, "succeeded": 0, "failed": 0, "resumed": 0, "webhooks_failed": 0,
+                      "lost_claims": 0}
+
+    def start(self):
+        self.store.open()
+        self._queue = asyncio.Queue()
+        self._http = httpx.AsyncClient(timeout=self.webhook_timeout)
+        self.store.purge(time.time() - self.retention_seconds)
+        resumed = self._resume(time.time())
+        if resumed:
+            log_event("jobs_resumed", count=resumed)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._keep_leases()))
+
+    def _resume(self, queued_before: float) -> int:
+        """Queue abandoned jobs; one queued in several processes runs once, claims settle it"""
+        self.store.expire_leases(time.time() - self.lease_seconds)
+        job_ids = self.store.queued(queued_before)
+        for job_id in job_ids:
+            self._queue.put_nowait(job_id)
+        self.stats["resumed"] += len(job_ids)
+        return len(job_ids)
+
+    async def _keep_leases(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                self.store.touch(list(self._running))
+                self._resume(time.time() - self.lease_seconds)
+            except Exception as e:
+                log_event("job_lease_renewal_failed", logging.WARNING, error=repr(e))
+
+    async def stop(self):
+        interrupted = list(self._running)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # hand them back right away instead of waiting for the lease to run out
+        self.store.requeue(interrupted)
+        if self._http is not None:
+            await self._http.aclose()
+
+    def submit(self, dedup_key: str, payload: dict, webhook: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Queue a job, or return the existing one for the same key. Second item is True when deduplicated"""
+        job, deduplicated = self.store.find_or_create(dedup_key, payload, time.time() - self.reuse_seconds, webhook)
+        if deduplicated:
+            self.stats["deduplicated"] += 1
+            return job, True
+        self.stats["submitted"] += 1
+        self._queue.put_nowait(job["id"])
+        return job, False
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(job_id, [])
+        if queue in queues:
+            queues.remove(queue)
+        if not queues:
+            self._subscribers.pop(job_id, None)
+
+    def runs_here(self, job_id: str) -> bool:
+        """True while this process executes the job, so its events reach local subscribers"""
+        return job_id in self._running
+
+    def _publish(self, job_id: str, event: str, data: Dict[str, Any]):
+        for queue in self._subscribers.get(job_id, []):
+            queue.put_nowait((event, data))
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                log_event("job_worker_error", logging.ERROR, job_id=job_id, error=repr(e))
+
+    async def _run(self, job_id: str):
+        job = self.store.claim(job_id)
+        if job is None:
+            # finished, or running in another worker
+            self.stats["lost_claims"] += 1
+            return
+        self._running.add(job_id)
+        try:
+            await self._execute(job)
+        finally:
+            self._running.discard(job_id)
+
+    async def _execute(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        partial: Dict[str, Any] = {}
+
+        def progress(stage: str, update: Dict[str, Any]):
+            partial.update(update)
+            self.store.update(job_id, stage=stage, result=partial)
+            self._publish(job_id, "progress", {"stage": stage, **update})
+
+        self._publish(job_id, "status", {"status": RUNNING})
+        try:
+            result = await self.runner(job, progress)
+            self.store.update(job_id, status=SUCCEEDED, stage="done", result=result)
+            self.stats["succeeded"] += 1
+        except Exception as e:
+            log_event("job_failed", logging.ERROR, job_id=job_id, error=repr(e))
+            self.store.update(job_id, status=FAILED, stage="failed", error=str(e))
+            self.stats["failed"] += 1
+        finished = self.store.get(job_id)
+        self._publish(job_id, "done", public_job(finished))
+        if finished.get("webhook"):
+            await self._notify(finished)
+
+    async def _notify(self, job: Dict[str, Any], attempts: int = 3):
+        error = await webhook_error(job["webhook"], self.webhook_hosts)
+        if error:
+            log_event("webhook_refused", logging.WARNING, job_id=job["id"], reason=error)
+            self.stats["webhooks_failed"] += 1
+            return
+        for attempt in range(attempts):
+            try:
+                response = await self._http.post(job["webhook"], json=public_job(job))
+                if response.status_code < 500:
+                    return
+            except Exception as e:
+                log_event("webhook_failed", logging.WARNING, job_id=job["id"], attempt=attempt + 1, error=repr(e))
+            if attempt + 1 < attempts:
+                await asyncio.sleep(2 ** attempt)
+        self.stats["webhooks_failed"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": len(self._running),
+            "subscribers": sum(len(q) for q in self._subscribers.values()),
+            "jobs": self.store.counts(),
+            "db": self.store.path,
+        }
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job as returned to clients (no dedup key or raw payload)"""
+    return {
+        "jobId": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "result": job["result"],
+        "error": job["error"],
+        "createdAt": job["created_at"],
+        "updatedAt": job["updated_at"],
+    }
@@ -0,0 +1,287 @@
+import asyncio
+import inspect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from scheduler import (
+    PRIORITY_DEFAULT,
+    CircuitBreaker,
+    RateLimiter,
+    backoff_delay,
+    is_retryable,
+    retry_after,
+    status_code,
+)
+from metrics import LLM_TOKENS
+from routing import Completion, ModelRouter
+from tracing import log_event, span
+from transcripts import estimate_tokens
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+
+def make_http_client(max_connections: int = 32, keepalive: int = 16, timeout: float = 60.0) -> httpx.AsyncClient:
+    """Shared pooled HTTP client for all LLM traffic"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=keepalive),
+        timeout=timeout,
+    )
+
+
+class LLMGateway:
+    """Async entry point for chat completions that never blocks the event loop.
+
+    Works with the async Groq client directly. A synchronous client is still
+    accepted and gets offloaded to a bounded thread pool. Every call goes
+    through the RateLimiter (priority lanes, RPM/TPM budget), is retried with
+    jittered backoff on 429/5xx/connection errors, and is refused early while
+    the circuit breaker is open.
+
+    Provider limits are per model, so models listed in `limiters` get their
+    own budget, and every model gets its own breaker. Calls that name a
+    `task` are routed by `router` (see routing.py) instead of using `model`.
+    """
+
+    def __init__(self, client, max_concurrency: int = 16, limiter: Optional[RateLimiter] = None,
+                 breaker: Optional[CircuitBreaker] = None, max_retries: int = 4, queue_timeout: float = 30.0,
+                 limiters: Optional[Dict[str, RateLimiter]] = None, router: Optional[ModelRouter] = None):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.limiter = limiter or RateLimiter(rpm=10_000, tpm=10_000_000, max_concurrency=max_concurrency)
+        self.breaker = breaker or CircuitBreaker()
+        self.limiters = limiters or {}
+        self._breakers: Dict[str, CircuitBreaker] = {DEFAULT_MODEL: self.breaker}
+        self.router = router
+        self.max_retries = max_retries
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0, "rejected": 0}
+
+    def _limiter(self, model: str) -> RateLimiter:
+        return self.limiters.get(model, self.limiter)
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(self.breaker.threshold, self.breaker.cooldown)
+        return self._breakers[model]
+
+    def _is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.client.chat.completions.create)
+
+    async def _create(self, **kwargs):
+        if self._is_async():
+            return await self.client.chat.completions.create(**kwargs)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: self.client.chat.completions.create(**kwargs)
+        )
+
+    async def _admit(self, model: str, priority: int, tokens: int):
+        try:
+            self._breaker(model).check()
+        except Exception:
+            self.stats["rejected"] += 1
+            raise
+        return await self._limiter(model).acquire(priority, tokens, timeout=self.queue_timeout)
+
+    async def _backoff(self, model: str, error: Exception, attempt: int, max_retries: int) -> bool:
+        """Record a failed attempt; sleep and return True if it should be retried"""
+        if not is_retryable(error):
+            return False
+        self._breaker(model).record_failure()
+        if status_code(error) == 429:
+            self.stats["rate_limited"] += 1
+        delay = retry_after(error)
+        if status_code(error) == 429 and delay is not None:
+            self._limiter(model).block_for(delay)
+        if attempt >= max_retries:
+            self.stats["failures"] += 1
+            return False
+        if delay is None:
+            delay = backoff_delay(attempt)
+        self.stats["retries"] += 1
+        log_event("llm_retry", logging.WARNING, model=model, attempt=attempt + 1, max_retries=max_retries,
+                  delay_s=round(delay, 2), error=repr(error))
+        await asyncio.sleep(delay)
+        return True
+
+    async def complete(self, prompt: str, max_tokens: int, temperature: float = 0.7, model: str = DEFAULT_MODEL,
+                       priority: int = PRIORITY_DEFAULT, task: Optional[str] = None, escalate: bool = False) -> str:
+        """Run a single-prompt chat completion and return the message text.
+
+        With a router, `task` picks the model; `escalate=True` asks for the
+        task's stronger model, e.g. after the first reply failed validation.
+        The text is a routing.Completion naming the model that wrote it.
+        """
+        if self.router is None or task is None:
+            text = await self._complete(prompt, max_tokens, temperature, model, priority, self.max_retries)
+            return Completion(text, model)
+        return await self.router.run(task, escalate, lambda routed, retries: self._complete(
+            prompt, max_tokens, temperature, routed, priority, self.max_retries if retries is None else retries
+        ))
+
+    def model_for(self, task: Optional[str]) -> str:
+        """Model that normally serves `task`, for keying cached outputs"""
+        if self.router is None or task is None:
+            return DEFAULT_MODEL
+        return self.router.model_for(task)
+
+    async def _complete(self, prompt: str, max_tokens: int, temperature: float, model: str, priority: int,
+                        max_retries: int) -> str:
+        tokens = estimate_tokens(prompt) + max_tokens
+        attempt = 0
+        while True:
+            with span("llm.queue", priority=priority):
+                ticket = await self._admit(model, priority, tokens)
+            self.stats["calls"] += 1
+            response, error = None, None
+            try:
+                with span("llm.call", model=model, priority=priority, attempt=attempt) as call:
+                    try:
+                        response = await self._create(
+                            messages=[{"role": "user", "content": prompt}],
+                            model=model,
+                            max_tokens=max_tokens,
+                            temperature=temperature,
+                        )
+                    except Exception as e:
+                        error = e
+                        call["outcome"] = f"http_{status_code(e)}" if status_code(e) else "error"
+            finally:
+                usage = getattr(response, "usage", None)
+                self._limiter(model).release(ticket, getattr(usage, "total_tokens", None))
+            if error is None:
+                self._breaker(model).record_success()
+                text = response.choices[0].message.content
+                self._count_tokens(model, usage, prompt, text)
+                return text
+            if await self._backoff(model, error, attempt, max_retries):
+                attempt += 1
+                continue
+            raise error
+
+    async def stream(self, prompt: str, max_tokens: int, temperature: float = 0.7, model: str = DEFAULT_MODEL,
+                     priority: int = PRIORITY_DEFAULT, task: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield completion text deltas as the model produces them.
+
+        Retries (and, with a router, the fallback model) only happen before
+        the first delta; a stream that breaks midway raises to the caller.
+        """
+        if self.router is None or task is None:
+            deltas = (Completion(delta, model) async for delta in
+                      self._stream(prompt, max_tokens, temperature, model, priority, self.max_retries))
+        else:
+            deltas = self.router.run_stream(task, lambda routed, retries: self._stream(
+                prompt, max_tokens, temperature, routed, priority, self.max_retries if retries is None else retries
+            ))
+        async for delta in deltas:
+            yield delta
+
+    async def _stream(self, prompt: str, max_tokens: int, temperature: float, model: str, priority: int,
+                      max_retries: int) -> AsyncIterator[str]:
+        kwargs = dict(
+            messages=[{"role": "user", "content": prompt}],
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+        )
+        tokens = estimate_tokens(prompt) + max_tokens
+        attempt = 0
+        while True:
+            with span("llm.queue", priority=priority):
+                ticket = await self._admit(model, priority, tokens)
+            self.stats["calls"] += 1
+            started = False
+            error = None
+            parts = []
+            try:
+                with span("llm.stream", model=model, priority=priority, attempt=attempt) as call:
+                    try:
+                        async for delta in self._stream_deltas(kwargs):
+                            started = True
+                            parts.append(delta)
+                            yield delta
+                    except Exception as e:
+                        error = e
+                        call["outcome"] = f"http_{status_code(e)}" if status_code(e) else "error"
+            finally:
+                # also runs when the client disconnects and the generator is closed
+                self._limiter(model).release(ticket)
+            if error is None:
+                self._breaker(model).record_success()
+                # streamed chunks carry no usage block, so count estimates
+                self._count_tokens(model, None, prompt, "".join(parts))
+                return
+            if not started and await self._backoff(model, error, attempt, max_retries):
+                attempt += 1
+                continue
+            raise error
+
+    async def _stream_deltas(self, kwargs: dict) -> AsyncIterator[str]:
+        if self._is_async():
+            stream = await self.client.chat.completions.create(**kwargs)
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+            return
+        # sync client: drain the blocking iterator on a worker thread and hand deltas back
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def pump():
+            try:
+                for chunk in self.client.chat.completions.create(**kwargs):
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        loop.call_soon_threadsafe(queue.put_nowait, delta)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        loop.run_in_executor(self._executor, pump)
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    @staticmethod
+    def _count_tokens(model: str, usage, prompt: str, text: str):
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        LLM_TOKENS.inc(prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt), model=model, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens if completion_tokens is not None else estimate_tokens(text or ""),
+                       model=model, kind="completion")
+
+    def waiting(self, max_priority: int) -> int:
+        """Calls queued at `max_priority` or a more urgent one, across every model's limiter"""
+        return sum(limiter.waiting(max_priority) for limiter in {self.limiter, *self.limiters.values()})
+
+    def snapshot(self) -> dict:
+        state = {**self.stats, "circuit": self.breaker.state, **self.limiter.snapshot()}
+        if self.limiters or len(self._breakers) > 1:
+            state["models"] = {
+                model: {"circuit": self._breaker(model).state, **self._limiter(model).snapshot()}
+                for model in {*self.limiters, *self._breakers}
+            }
+        if self.router is not None:
+            state["routing"] = self.router.snapshot()
+        return state
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
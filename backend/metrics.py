@@ -0,0 +1,195 @@
+import logging
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; covers cache hits (ms) through map-reduce summaries (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0)
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        out = []
+        with self._lock:
+            for key, state in self._values.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    out.append((f"{self.name}_bucket", {**labels, "le": _number(bound)}, cumulative))
+                out.append((f"{self.name}_sum", labels, state["sum"]))
+                out.append((f"{self.name}_count", labels, state["count"]))
+        return out
+
+
+class Registry:
+    """Metrics rendered in the Prometheus text exposition format.
+
+    Besides the metrics it owns, collectors registered with `collector()` are
+    called at scrape time, so component stats dicts (cache, scheduler, jobs)
+    are exported without double bookkeeping.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def _add(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        """Register fn() -> [(name, kind, help, [(labels, value), ...]), ...]"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for fn in self._collectors:
+            try:
+                families = list(fn())
+            except Exception as e:
+                # imported here: tracing itself imports this module
+                from tracing import log_event
+                log_event("metrics_collector_failed", logging.ERROR, collector=getattr(fn, "__name__", str(fn)),
+                          error=repr(e))
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to response headers per route", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests currently being handled")
+RESPONSE_BYTES = REGISTRY.counter(
+    "http_response_bytes_total", "Response body bytes sent, by content encoding", ("encoding",)
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "stage_duration_seconds", "Duration of pipeline stages (spans)", ("stage", "outcome")
+)
+MODEL_SECONDS = REGISTRY.histogram(
+    "llm_model_duration_seconds", "Routed LLM calls per model, including retries", ("model", "outcome")
+)
+ROUTING_DECISIONS = REGISTRY.counter(
+    "llm_routing_decisions_total", "Model chosen per task: primary, escalated or fallback", ("task", "model", "reason")
+)
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens sent to and received from the LLM", ("model", "kind"))
+FALLBACKS = REGISTRY.counter("fallback_responses_total", "Responses that served fallback content", ("artifact",))
+PARSE_FAILURES = REGISTRY.counter("llm_parse_failures_total", "Model replies that were not the expected JSON", ("artifact",))
+JSON_REPAIRS = REGISTRY.counter(
+    "llm_json_repairs_total", "Model replies whose JSON was recovered by repair, by defect", ("defect",)
+)
+
+
+def stats_family(name: str, help: str, stats: Dict[str, float], label: str, kind: str = "counter",
+                 extra: Optional[Dict[str, str]] = None) -> Tuple[str, str, str, List[Sample]]:
+    """One metric family from a component's stats dict, one sample per key"""
+    return name, kind, help, [({**(extra or {}), label: key}, value) for key, value in stats.items()]
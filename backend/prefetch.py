@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from cache import speculative
+from tracing import log_event
+
+
+class Prefetcher:
+    """Speculative generation of the artifacts a client is likely to ask for next.
+
+    `schedule` starts the work as a background task marked speculative, so
+    the SingleFlights it goes through cancel it when it is abandoned. The
+    endpoint that later asks for the artifact finds it in the cache or joins
+    the in-flight call, which then runs to completion for it. While tasks
+    are pending, `pressure()` is polled every `check_interval` seconds; when
+    it reports load, all speculative work is cancelled and no new work is
+    accepted until it clears.
+    """
+
+    def __init__(self, enabled: bool = False, max_pending: int = 32,
+                 pressure: Callable[[], bool] = lambda: False, check_interval: float = 0.5):
+        self.enabled = enabled
+        self.max_pending = max_pending
+        self.pressure = pressure
+        self.check_interval = check_interval
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        self.stats = {"scheduled": 0, "completed": 0, "failed": 0, "cancelled": 0, "skipped": 0}
+
+    def schedule(self, key: str, factory: Callable[[], Awaitable]) -> bool:
+        """Start `factory()` in the background unless disabled, already pending, full or under load"""
+        if not self.enabled or key in self._tasks:
+            return False
+        if len(self._tasks) >= self.max_pending or self.pressure():
+            self.stats["skipped"] += 1
+            return False
+        task = asyncio.ensure_future(self._run(key, factory))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        self.stats["scheduled"] += 1
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.ensure_future(self._watch())
+        return True
+
+    async def _run(self, key: str, factory: Callable[[], Awaitable]):
+        # the task runs in a copy of the caller's context, so this only marks the prefetch
+        speculative.set(True)
+        try:
+            await factory()
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            log_event("prefetch_failed", logging.WARNING, key=key, error=repr(e))
+            return
+        self.stats["completed"] += 1
+
+    async def _watch(self):
+        while self._tasks:
+            await asyncio.sleep(self.check_interval)
+            if self._tasks and self.pressure():
+                log_event("prefetch_shed", logging.WARNING, tasks=len(self._tasks))
+                self.shed()
+
+    def shed(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def close(self):
+        tasks = list(self._tasks.values())
+        if self._watcher is not None:
+            tasks.append(self._watcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,87 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from transcripts import Chunk, SegmentStore, chunk_segments
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be but by do does for from has have how i if in into is it its of on or so that the "
+    "their then there these this to was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over transcript passages, pure Python"""
+
+    def __init__(self, passages: List[Chunk], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        for doc_id, passage in enumerate(passages):
+            counts = Counter(tokenize(passage.text))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        n = len(passages)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    @classmethod
+    def from_segments(cls, store: SegmentStore, passage_tokens: int = 160) -> "BM25Index":
+        return cls(chunk_segments(store, passage_tokens))
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[float, Chunk]]:
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        # keep the chosen passages in video order so the prompt reads naturally
+        best.sort(key=lambda item: item[0])
+        return [(score, self.passages[doc_id]) for doc_id, score in best]
+
+
+class IndexCache:
+    """Bounded LRU of built indexes, keyed by transcript hash"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "builds": 0}
+
+    def get(self, key: str) -> Optional[BM25Index]:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                self.stats["hits"] += 1
+            return index
+
+    def get_or_build(self, key: str, store: SegmentStore) -> BM25Index:
+        index = self.get(key)
+        if index is not None:
+            return index
+        index = BM25Index.from_segments(store)
+        with self._lock:
+            self.stats["builds"] += 1
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        return index
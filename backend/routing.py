@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional
+
+from metrics import MODEL_SECONDS, ROUTING_DECISIONS
+from scheduler import CircuitOpenError, is_retryable
+from tracing import log_event
+
+FAST_MODEL = "llama-3.1-8b-instant"
+
+# Extraction and reformatting work that a small model handles well; everything else stays on the large model
+FAST_TASKS = ("keypoints", "process-keypoints", "questions", "translate", "chat-fold", "mapreduce-map")
+
+
+class Completion(str):
+    """Completion text that remembers which model wrote it and why (primary, escalated or fallback).
+
+    Callers key cached outputs by the task's primary model, so they use
+    `fallback` to avoid storing a stand-in model's output under that key.
+    """
+
+    def __new__(cls, text: str, model: str, reason: str = "primary"):
+        completion = super().__new__(cls, text)
+        completion.model = model
+        completion.reason = reason
+        return completion
+
+    @property
+    def fallback(self) -> bool:
+        return self.reason == "fallback"
+
+
+def is_fallback(text: str) -> bool:
+    """True for output of a fallback model; plain strings (e.g. from the cache) are not"""
+    return getattr(text, "reason", None) == "fallback"
+
+
+@dataclass
+class Route:
+    model: str
+    # used when the model is rate limited, failing or slower than `fallback_after`
+    fallback: Optional[str] = None
+    # used when the caller asks again because the reply failed validation
+    escalate_to: Optional[str] = None
+
+
+def should_fall_back(error: BaseException) -> bool:
+    """Errors that say "this model is busy or down right now", as opposed to a bad request"""
+    return isinstance(error, (asyncio.TimeoutError, CircuitOpenError)) or is_retryable(error)
+
+
+class ModelRouter:
+    """Chooses the model for each task.
+
+    Fast-tier tasks run on the small model and escalate to the large one
+    when the caller's validation fails; every route falls back to the other
+    tier when its model is rate limited, failing, or has not answered within
+    `fallback_after` seconds. With a fallback available the primary only
+    gets `primary_retries` retries, so a 429 storm moves traffic over
+    instead of waiting it out. Decisions and per-model latency go to
+    /metrics and `stats`.
+    """
+
+    def __init__(self, routes: Dict[str, Route], default: Route, fallback_after: float = 30.0,
+                 primary_retries: int = 1):
+        self.routes = routes
+        self.default = default
+        self.fallback_after = fallback_after
+        self.primary_retries = primary_retries
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def tiered(cls, large: str, fast: str, fast_tasks: Iterable[str] = FAST_TASKS, **kwargs) -> "ModelRouter":
+        if fast == large:
+            # routing disabled: one model, no fallback
+            return cls({}, Route(large), **kwargs)
+        routes = {task: Route(fast, fallback=large, escalate_to=large) for task in fast_tasks}
+        return cls(routes, Route(large, fallback=fast), **kwargs)
+
+    def route(self, task: str) -> Route:
+        return self.routes.get(task, self.default)
+
+    def model_for(self, task: str) -> str:
+        """The model that normally serves `task`; cache keys name it"""
+        return self.route(task).model
+
+    def _plan(self, task: str, escalate: bool):
+        route = self.route(task)
+        if escalate and route.escalate_to:
+            model, reason = route.escalate_to, "escalated"
+        else:
+            model, reason = route.model, "primary"
+        fallback = route.fallback if route.fallback != model else None
+        return model, reason, fallback
+
+    def _record(self, task: str, model: str, reason: str, outcome: str, seconds: float):
+        ROUTING_DECISIONS.inc(task=task, model=model, reason=reason)
+        MODEL_SECONDS.observe(seconds, model=model, outcome=outcome)
+        counts = self.stats.setdefault(task, {})
+        counts[f"{reason}:{model}"] = counts.get(f"{reason}:{model}", 0) + 1
+
+    async def run(self, task: str, escalate: bool, call: Callable[[str, Optional[int]], Awaitable[str]]) -> Completion:
+        """`call(model, max_retries)` on the chosen model, then on the fallback if the first one is unavailable"""
+        model, reason, fallback = self._plan(task, escalate)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                call(model, self.primary_retries if fallback else None), self.fallback_after if fallback else None
+            )
+        except Exception as e:
+            self._record(task, model, reason, "timeout" if isinstance(e, asyncio.TimeoutError) else "error",
+                         time.perf_counter() - start)
+            if fallback is None or not should_fall_back(e):
+                raise
+            log_event("model_fallback", logging.WARNING, task=task, model=model, fallback=fallback, error=repr(e))
+            start = time.perf_counter()
+            try:
+                result = await call(fallback, None)
+            except Exception:
+                self._record(task, fallback, "fallback", "error", time.perf_counter() - start)
+                raise
+            self._record(task, fallback, "fallback", "ok", time.perf_counter() - start)
+            return Completion(result, fallback, "fallback")
+        self._record(task, model, reason, "ok", time.perf_counter() - start)
+        return Completion(result, model, reason)
+
+    async def run_stream(self, task: str, open_stream: Callable[[str, Optional[int]], AsyncIterator[str]]) -> AsyncIterator[Completion]:
+        """Stream from the chosen model; falls back only if it fails before the first delta"""
+        model, reason, fallback = self._plan(task, False)
+        start = time.perf_counter()
+        started = False
+        try:
+            async for delta in open_stream(model, self.primary_retries if fallback else None):
+                started = True
+                yield Completion(delta, model, reason)
+        except Exception as e:
+            self._record(task, model, reason, "error", time.perf_counter() - start)
+            if started or fallback is None or not should_fall_back(e):
+                raise
+            log_event("model_fallback", logging.WARNING, task=task, model=model, fallback=fallback, stream=True, error=repr(e))
+            start = time.perf_counter()
+            try:
+                async for delta in open_stream(fallback, None):
+                    yield Completion(delta, fallback, "fallback")
+            except Exception:
+                self._record(task, fallback, "fallback", "error", time.perf_counter() - start)
+                raise
+            self._record(task, fallback, "fallback", "ok", time.perf_counter() - start)
+            return
+        self._record(task, model, reason, "ok", time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        return {
+            "routes": {task: vars(route) for task, route in self.routes.items()},
+            "default": vars(self.default),
+            "fallback_after": self.fallback_after,
+            "decisions": self.stats,
+        }
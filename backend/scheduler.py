@@ -0,0 +1,249 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable, Optional, Set
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BULK = 2
+
+WINDOW_SECONDS = 60.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while the circuit breaker is open"""
+
+
+class Urgency:
+    """Priority of work shared by several callers, raised when a more urgent one joins.
+
+    SingleFlight gives each shared task one (see `urgency`). Calls the task
+    queues in a RateLimiter move up with it, so an interactive request that
+    joins prefetched bulk work does not wait in the bulk lane.
+    """
+
+    def __init__(self, priority: Optional[int] = None):
+        self.priority = priority
+        self._listeners: Set[Callable[[int], None]] = set()
+
+    def listen(self, callback: Callable[[int], None]):
+        self._listeners.add(callback)
+
+    def unlisten(self, callback: Callable[[int], None]):
+        self._listeners.discard(callback)
+
+    def raise_to(self, priority: int) -> bool:
+        if self.priority is not None and priority >= self.priority:
+            return False
+        self.priority = priority
+        for callback in list(self._listeners):
+            callback(priority)
+        return True
+
+
+# Urgency of the shared task the current code runs for, if any; copied into tasks it spawns
+urgency: ContextVar[Optional[Urgency]] = ContextVar("urgency", default=None)
+
+
+class Ticket:
+    __slots__ = ("started", "tokens")
+
+    def __init__(self, started: float, tokens: int):
+        self.started = started
+        self.tokens = tokens
+
+
+class RateLimiter:
+    """Priority scheduler for LLM calls under requests- and tokens-per-minute budgets.
+
+    Callers queue with a priority and a token estimate. The head of the queue
+    (lowest priority value, then FIFO) is admitted as soon as a concurrency
+    slot is free and the sliding one-minute window has room for it, so
+    interactive calls overtake bulk work that is still waiting. Calls made
+    for shared work queue at its Urgency and move up when it is raised.
+    """
+
+    def __init__(self, rpm: int = 30, tpm: int = 6000, max_concurrency: int = 16):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self._window: "deque[Ticket]" = deque()
+        self._window_tokens = 0
+        self._in_flight = 0
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._blocked_until = 0.0
+
+    def _prune(self, now: float):
+        while self._window and self._window[0].started <= now - WINDOW_SECONDS:
+            self._window_tokens -= self._window.popleft().tokens
+
+    def _delay(self, tokens: int, now: float) -> Optional[float]:
+        """Seconds until a call of `tokens` fits; None when it must wait for a release"""
+        if self._in_flight >= self.max_concurrency:
+            return None
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._prune(now)
+        # a single call larger than the whole budget is admitted into an empty window
+        tokens = min(tokens, self.tpm)
+        if len(self._window) + 1 <= self.rpm and self._window_tokens + tokens <= self.tpm:
+            return 0.0
+        count, used = len(self._window), self._window_tokens
+        for ticket in self._window:
+            count -= 1
+            used -= ticket.tokens
+            if count + 1 <= self.rpm and used + tokens <= self.tpm:
+                return ticket.started + WINDOW_SECONDS - now
+        return WINDOW_SECONDS
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            priority, seq, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            delay = self._delay(tokens, now)
+            if delay is None:
+                return
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            ticket = Ticket(now, tokens)
+            self._window.append(ticket)
+            self._window_tokens += tokens
+            self._in_flight += 1
+            future.set_result(ticket)
+
+    async def acquire(self, priority: int, tokens: int, timeout: Optional[float] = None) -> Ticket:
+        future = asyncio.get_running_loop().create_future()
+        shared = urgency.get()
+        if shared is not None and shared.priority is not None:
+            priority = min(priority, shared.priority)
+        entry = [priority, next(self._seq), tokens, future]
+        heapq.heappush(self._waiters, entry)
+
+        def promote(raised: int):
+            if not future.done() and raised < entry[0]:
+                entry[0] = raised
+                heapq.heapify(self._waiters)
+                self._dispatch()
+
+        if shared is not None:
+            shared.listen(promote)
+        self._dispatch()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # admitted just as we gave up: hand the slot back
+                self.release(future.result())
+            else:
+                future.cancel()
+            raise
+        finally:
+            if shared is not None:
+                shared.unlisten(promote)
+
+    def waiting(self, max_priority: int) -> int:
+        """Callers still queued at `max_priority` or a more urgent one"""
+        return sum(1 for w in self._waiters if w[0] <= max_priority and not w[3].done())
+
+    def release(self, ticket: Ticket, actual_tokens: Optional[int] = None):
+        if actual_tokens is not None and ticket in self._window:
+            self._window_tokens += actual_tokens - ticket.tokens
+            ticket.tokens = actual_tokens
+        self._in_flight -= 1
+        self._dispatch()
+
+    def block_for(self, seconds: float):
+        """Hold all admissions, e.g. after the provider answered 429 with Retry-After"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def snapshot(self) -> dict:
+        self._prune(time.monotonic())
+        return {
+            "in_flight": self._in_flight,
+            "queued": sum(1 for w in self._waiters if not w[3].done()),
+            "window_requests": len(self._window),
+            "window_tokens": self._window_tokens,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+        }
+
+
+class CircuitBreaker:
+    """Fail fast after `threshold` consecutive provider failures, probe again after `cooldown`"""
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def check(self):
+        if self.state == "open":
+            raise CircuitOpenError("LLM provider circuit is open after repeated failures")
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold or self.state == "half-open":
+            self.opened_at = time.monotonic()
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def status_code(error: Exception) -> Optional[int]:
+    code = getattr(error, "status_code", None)
+    if code is None and getattr(error, "response", None) is not None:
+        code = getattr(error.response, "status_code", None)
+    return code
+
+
+def is_retryable(error: Exception) -> bool:
+    code = status_code(error)
+    if code is not None:
+        return code == 429 or code >= 500
+    # connection resets and timeouts carry no status code
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or type(error).__name__ in (
+        "APIConnectionError",
+        "APITimeoutError",
+    )
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,56 @@
+"""Production entry point: several uvicorn worker processes behind one port.
+
+Each worker imports main.py and opens its own Groq and transcript clients at
+startup. Workers share the response cache, transcript handles, chat sessions
+and the job queue through SQLite files in --state-dir, and each gets an
+equal share of the Groq rate limits. On SIGTERM/SIGINT workers stop taking
+connections, finish in-flight requests for up to --graceful-timeout
+seconds, and put interrupted jobs back in the queue for the next start.
+
+    cd backend && python3 serve.py --workers 4
+"""
+import argparse
+import os
+import sys
+
+import uvicorn
+from dotenv import load_dotenv
+
+
+def main_cli():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "3001")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1))))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30")),
+                        help="seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--state-dir", default=os.getenv("STATE_DIR", "."),
+                        help="directory for the shared cache and job databases")
+    args = parser.parse_args()
+
+    if not os.getenv("GROQ_API_KEY"):
+        # fail here rather than once per worker
+        sys.exit("❌ GROQ_API_KEY not found in environment variables")
+    workers = max(1, args.workers)
+    state_dir = os.path.abspath(args.state_dir)
+    os.makedirs(state_dir, exist_ok=True)
+    # read by every worker when it imports main.py
+    os.environ["SERVER_WORKERS"] = str(workers)
+    os.environ.setdefault("CACHE_DB_PATH", os.path.join(state_dir, "cache.sqlite3"))
+    os.environ.setdefault("JOBS_DB_PATH", os.path.join(state_dir, "jobs.sqlite3"))
+    print(f"✅ Starting {workers} worker(s) on {args.host}:{args.port}, state in {state_dir}")
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main_cli()
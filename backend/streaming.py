@@ -0,0 +1,114 @@
+import json
+from typing import List, Optional, Tuple
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class SummaryStreamParser:
+    """Incremental scanner for the summary JSON produced by /api/summary.
+
+    Feed it model deltas as they arrive; it returns each field as soon as it
+    is well-formed: ("title", str), ("paragraph", str), ("bullet", str) and
+    ("section", dict) once a whole section object has closed. Text before
+    the first "{" (e.g. a ```json fence) and after the root object is ignored.
+    Works whether or not the model wraps everything in a "summary" key.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[dict] = []
+        self._started = False
+        self.finished = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    def _path(self) -> List[str]:
+        path = []
+        for frame in self._stack:
+            if frame["type"] == "arr":
+                path.append("[]")
+            elif frame["key"] is not None:
+                path.append(frame["key"])
+        if path and path[0] == "summary":
+            path = path[1:]
+        return path
+
+    def _on_string(self, value: str) -> Optional[Tuple[str, object]]:
+        top = self._stack[-1]
+        if top["type"] == "obj" and top["expect_key"]:
+            top["key"] = value
+            top["expect_key"] = False
+            return None
+        path = self._path()
+        if path == ["title"]:
+            return ("title", value)
+        if path == ["paragraphs", "[]"]:
+            return ("paragraph", value)
+        if path == ["bullets", "[]"]:
+            return ("bullet", value)
+        return None
+
+    def feed(self, delta: str) -> List[Tuple[str, object]]:
+        events: List[Tuple[str, object]] = []
+        self.buffer += delta
+        text = self.buffer
+        i = self._pos
+        while i < len(text) and not self.finished:
+            ch = text[i]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._stack.append({"type": "obj", "key": None, "expect_key": True, "start": i})
+                i += 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    try:
+                        value = json.loads(text[self._string_start:i + 1])
+                    except ValueError:
+                        value = text[self._string_start + 1:i]
+                    event = self._on_string(value)
+                    if event:
+                        events.append(event)
+                i += 1
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._stack.append({
+                    "type": "obj" if ch == "{" else "arr",
+                    "key": None,
+                    "expect_key": ch == "{",
+                    "start": i,
+                })
+            elif ch in "}]":
+                frame = self._stack.pop()
+                if not self._stack:
+                    self.finished = True
+                elif frame["type"] == "obj" and self._path() == ["sections", "[]"]:
+                    try:
+                        events.append(("section", json.loads(text[frame["start"]:i + 1])))
+                    except ValueError:
+                        pass
+            elif ch == ",":
+                top = self._stack[-1]
+                if top["type"] == "obj":
+                    top["expect_key"] = True
+                    top["key"] = None
+            i += 1
+        self._pos = i
+        return events
+
@@ -0,0 +1,68 @@
+from typing import List
+
+# Order matters: parts are requested and returned in this order
+PARTS = ("summary", "keyPoints", "questions")
+
+# Completion budget per part; a combined request asks for the sum of its parts
+PART_MAX_TOKENS = {"summary": 500, "keyPoints": 400, "questions": 800}
+
+def _schema(part: str, language: str) -> str:
+    if part == "summary":
+        return f"""  "summary": {{
+    "title": "Short title in {language}",
+    "paragraphs": ["Paragraph 1 in {language}", "Paragraph 2 ..."],
+    "bullets": ["Bullet 1 ...", "Bullet 2 ..."],
+    "sections": [
+      {{
+        "heading": "Section heading in {language}",
+        "bullets": ["Point 1 ...", "Point 2 ..."],
+        "paragraphs": ["Optional paragraph ..."]
+      }}
+    ]
+  }}"""
+    if part == "keyPoints":
+        return f"""  "keyPoints": [
+    {{ "id": "1", "text": "Concise key point in {language}" }},
+    {{ "id": "2", "text": "Another specific key point in {language}" }}
+  ]"""
+    return f"""  "questions": [
+    {{
+      "id": "1",
+      "question": "Specific question about the actual content, in {language}",
+      "answer": "Detailed answer based on transcript content",
+      "difficulty": "easy"
+    }}
+  ]"""
+
+
+def _instructions(parts: List[str]) -> str:
+    lines = []
+    if "summary" in parts:
+        lines.append('- "summary": a clean structured summary of the transcript.')
+    if "keyPoints" in parts:
+        lines.append('- "keyPoints": the key points of the transcript, one concise idea each.')
+    if "questions" in parts:
+        lines.append(
+            '- "questions": 4 practice questions SPECIFIC to the content (topics, examples, numbers mentioned), '
+            "at least 2 numerical if relevant, each with a comprehensive answer and a difficulty of easy, medium or hard."
+        )
+    return "\n".join(lines)
+
+
+def pack_prompt(transcript_chunk: str, language: str, parts: List[str]) -> str:
+    """One prompt asking for every requested part over a single copy of the transcript"""
+    schema = ",\n".join(_schema(part, language) for part in parts)
+    return f"""
+You are an expert educator preparing study material from a YouTube transcript.
+Produce the following, all in {language} language:
+{_instructions(parts)}
+
+Return ONLY valid JSON in this exact structure (no backticks, no extra text):
+{{
+{schema}
+}}
+
+Transcript:
+{transcript_chunk}
+"""
+
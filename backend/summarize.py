@@ -0,0 +1,144 @@
+import asyncio
+from typing import List, Optional
+
+from cache import SingleFlight, TieredCache, content_hash, make_key
+from extract import extract_parts
+from llm import LLMGateway
+from routing import is_fallback
+from scheduler import PRIORITY_BULK, PRIORITY_DEFAULT
+from transcripts import Chunk, SegmentStore, chunk_segments, estimate_tokens
+
+MAP_PROMPT_VERSION = 2
+
+
+class MapReduceSummarizer:
+    """Hierarchical summary of an arbitrarily long transcript.
+
+    The transcript is split into token-budgeted chunks that are summarized
+    concurrently (map). Partial notes are merged into the final summary and
+    key points (reduce), with intermediate merge rounds when the notes
+    themselves exceed the reduce budget. Chunk notes are cached, so a retry
+    after a failed reduce only pays for the reduce. Notes a fallback model
+    wrote are used but not cached, and the result says whether any were.
+    """
+
+    def __init__(self, llm: LLMGateway, cache: TieredCache, flights: Optional[SingleFlight] = None,
+                 chunk_tokens: int = 3000, reduce_tokens: int = 6000, parallelism: int = 4):
+        self.llm = llm
+        self.cache = cache
+        self.flights = flights or SingleFlight()
+        self.chunk_tokens = chunk_tokens
+        self.reduce_tokens = reduce_tokens
+        self.parallelism = parallelism
+
+    async def _cached_complete(self, key: str, prompt: str, max_tokens: int, temperature: float,
+                               priority: int = PRIORITY_DEFAULT) -> str:
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            return cached
+
+        async def run() -> str:
+            text = await self.llm.complete(prompt, max_tokens=max_tokens, temperature=temperature,
+                                           priority=priority, task="mapreduce-map")
+            if not is_fallback(text):
+                await self.cache.aset(key, text)
+            return text
+
+        return await self.flights.do(key, run, priority)
+
+    async def _map(self, chunks: List[str], language: str, labels: Optional[List[str]] = None) -> List[str]:
+        semaphore = asyncio.Semaphore(self.parallelism)
+
+        async def summarize_chunk(index: int, chunk: str) -> str:
+            label = f" (video time {labels[index]})" if labels else ""
+            prompt = f"""
+You are summarizing part {index + 1} of {len(chunks)}{label} of a YouTube transcript.
+Write compact study notes for THIS PART ONLY: the main ideas, definitions, examples and any numbers mentioned.
+Use short bullet lines. Respond in {language} language.
+
+Transcript part:
+{chunk}
+"""
+            key = make_key("map", content_hash(label + chunk), language, self.llm.model_for("mapreduce-map"),
+                           MAP_PROMPT_VERSION)
+            async with semaphore:
+                # many map calls per video: keep them behind interactive chat in the scheduler
+                return await self._cached_complete(key, prompt, max_tokens=350, temperature=0.3,
+                                                   priority=PRIORITY_BULK)
+
+        return await asyncio.gather(*(summarize_chunk(i, c) for i, c in enumerate(chunks)))
+
+    async def _condense(self, notes: List[str], language: str) -> List[str]:
+        """Merge groups of partial notes until they fit into one reduce prompt"""
+        while estimate_tokens("\n\n".join(notes)) > self.reduce_tokens and len(notes) > 1:
+            groups, current, size = [], [], 0
+            for note in notes:
+                tokens = estimate_tokens(note)
+                if current and size + tokens > self.reduce_tokens:
+                    groups.append(current)
+                    current, size = [], 0
+                current.append(note)
+                size += tokens
+            groups.append(current)
+            if len(groups) == len(notes):
+                # every note is already as large as the budget; pair them up so the loop makes progress
+                groups = [notes[i:i + 2] for i in range(0, len(notes), 2)]
+            notes = await self._map(["\n\n".join(g) for g in groups], language)
+        return notes
+
+    def chunks_for(self, transcript: str, segments: Optional[SegmentStore] = None) -> List[Chunk]:
+        store = segments if segments is not None else SegmentStore.from_text(transcript)
+        return chunk_segments(store, self.chunk_tokens)
+
+    async def summarize(self, transcript: str, language: str, segments: Optional[SegmentStore] = None) -> dict:
+        """Return {"summary": {...}, "keyPoints": [...], "chunks": n, "fallback": bool} for the whole transcript.
+
+        When timed `segments` are given, each part carries its time range so
+        the notes (and the final summary) can refer to moments in the video.
+        """
+        chunks = self.chunks_for(transcript, segments)
+        if not chunks:
+            raise ValueError("Transcript is empty")
+        timed = chunks[-1].end > 0
+        labels = [c.label for c in chunks] if timed else None
+        notes = await self._map([c.text for c in chunks], language, labels)
+        fallback = any(is_fallback(note) for note in notes)
+        if timed and estimate_tokens("\n\n".join(notes)) <= self.reduce_tokens:
+            headers = [f"Part {i + 1} ({labels[i]})" for i in range(len(notes))]
+        else:
+            notes = await self._condense(notes, language)
+            fallback = fallback or any(is_fallback(note) for note in notes)
+            headers = [f"Part {i + 1}" for i in range(len(notes))]
+        joined = "\n\n".join(f"{h}:\n{n.strip()}" for h, n in zip(headers, notes))
+
+        prompt = f"""
+You are a helpful assistant. Below are notes covering a full YouTube video, part by part, in order.
+Combine them into one summary of the WHOLE video and its key points.
+Return ONLY valid JSON in this exact structure (no backticks, no extra text):
+{{
+  "summary": {{
+    "title": "Short title in {language}",
+    "paragraphs": ["Paragraph 1 in {language}", "Paragraph 2 ..."],
+    "bullets": ["Bullet 1 ...", "Bullet 2 ..."],
+    "sections": [
+      {{
+        "heading": "Section heading in {language}",
+        "bullets": ["Point 1 ...", "Point 2 ..."],
+        "paragraphs": ["Optional paragraph ..."]
+      }}
+    ]
+  }},
+  "keyPoints": [
+    {{ "id": "1", "text": "Concise key point in {language}" }}
+  ]
+}}
+
+Notes:
+{joined}
+"""
+        raw = await self.llm.complete(prompt, max_tokens=1200, temperature=0.5, task="mapreduce-reduce")
+        data = extract_parts(raw, ["summary", "keyPoints"])
+        if "summary" not in data:
+            raise ValueError("Reduce step did not return a summary object")
+        return {"summary": data["summary"], "keyPoints": data.get("keyPoints", []), "chunks": len(chunks),
+                "fallback": fallback or is_fallback(raw)}
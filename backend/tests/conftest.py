@@ -0,0 +1,53 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+# backend modules are imported as top-level siblings, as when the app runs from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("JOBS_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="tests-"), "jobs.sqlite3"))
+os.environ.pop("CACHE_DB_PATH", None)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """main.py with a fresh fake Groq client behind a fresh gateway; returns (main, fake).
+
+    The cache is shared across tests, so each test should use its own transcript text.
+    """
+    import main
+    from bench.fakes import FakeAsyncGroq, smart_reply
+    from llm import LLMGateway
+
+    fake = FakeAsyncGroq(latency=0, content=smart_reply)
+    gateway = LLMGateway(fake, max_concurrency=64)
+    monkeypatch.setattr(main, "client", fake)
+    # components built at import time hold their own reference to the gateway
+    for owner in (main, main.summarizer, main.translator, main.chat_memory):
+        monkeypatch.setattr(owner, "llm", gateway)
+    return main, fake
+
+
+def request(main, method: str, path: str, **kwargs):
+    """One request against the ASGI app, without running its startup hooks"""
+    import httpx
+
+    async def send():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+
+def sse_events(body: str) -> list:
+    """(event, data) pairs of a Server-Sent Events body"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from batch import BatchPipeline, LocalPlaylistResolver
+from bench.fakes import FakeTranscriptProvider, make_snippets
+from conftest import request, sse_events
+
+
+def test_playlists_are_read_again_when_the_file_changes(tmp_path):
+    path = tmp_path / "playlists.json"
+    path.write_text(json.dumps({"intro": ["aaaaaaaaaaa"]}))
+    resolver = LocalPlaylistResolver(str(path))
+    assert asyncio.run(resolver.resolve("intro")) == ["aaaaaaaaaaa"]
+
+    path.write_text(json.dumps({"intro": ["aaaaaaaaaaa", "bbbbbbbbbbb"]}))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+    assert asyncio.run(resolver.resolve("intro")) == ["aaaaaaaaaaa", "bbbbbbbbbbb"]
+    with pytest.raises(LookupError):
+        asyncio.run(resolver.resolve("missing"))
+
+
+def test_missing_playlist_file_is_an_unknown_playlist(tmp_path):
+    with pytest.raises(LookupError):
+        asyncio.run(LocalPlaylistResolver(str(tmp_path / "none.json")).resolve("intro"))
+
+
+class Stages:
+    """Fake fetch/generate steps that record how many run at once"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.active = {"fetch": 0, "generate": 0}
+        self.peak = {"fetch": 0, "generate": 0}
+        self.generated = []
+
+    async def _busy(self, stage, seconds):
+        self.active[stage] += 1
+        self.peak[stage] = max(self.peak[stage], self.active[stage])
+        await asyncio.sleep(seconds)
+        self.active[stage] -= 1
+
+    async def fetch(self, video_id):
+        await self._busy("fetch", 0.01)
+        return f"segments of {video_id}"
+
+    async def generate(self, video_id, segments, options):
+        await self._busy("generate", 0.02)
+        if video_id in self.fail:
+            raise RuntimeError(f"generation failed for {video_id}")
+        self.generated.append(video_id)
+        return {"summary": segments, "language": options["language"]}
+
+
+def pipeline(stages, **kwargs):
+    return BatchPipeline(lambda url: url.rsplit("=", 1)[-1] if "v=" in url else None, stages.fetch, stages.generate,
+                         **kwargs)
+
+
+async def collect(batch, sources):
+    return [item async for item in batch.run(sources, {"language": "en"})]
+
+
+def test_stages_respect_their_concurrency_limits():
+    stages = Stages()
+    batch = pipeline(stages, fetch_concurrency=3, generate_concurrency=2)
+    sources = [f"video{i:06d}" for i in range(10)]
+    items = asyncio.run(collect(batch, sources))
+    assert sorted(item["index"] for item in items) == list(range(10))
+    assert all(item["status"] == "succeeded" for item in items)
+    assert stages.peak == {"fetch": 3, "generate": 2}
+
+
+def test_failures_are_reported_per_item():
+    stages = Stages(fail={"badvideo000"})
+    batch = pipeline(stages)
+    items = asyncio.run(collect(batch, ["goodvideo00", "badvideo000", "https://example.com/nothing"]))
+    by_source = {item["source"]: item for item in items}
+    assert by_source["goodvideo00"]["status"] == "succeeded"
+    assert by_source["badvideo000"]["error"] == "generation failed for badvideo000"
+    assert by_source["https://example.com/nothing"]["error"] == "Invalid YouTube URL"
+    assert batch.stats == {"batches": 1, "items": 3, "succeeded": 1, "failed": 2}
+
+
+def test_closing_the_stream_drops_items_not_started():
+    stages = Stages()
+    batch = pipeline(stages, generate_concurrency=1)
+
+    async def run():
+        results = batch.run([f"video{i:06d}" for i in range(10)], {"language": "en"})
+        first = await results.__anext__()
+        await results.aclose()
+        await asyncio.sleep(0.1)
+        return first
+    assert asyncio.run(run())["status"] == "succeeded"
+    assert len(stages.generated) < 10
+
+
+def test_batch_endpoint_streams_items_and_playlist_errors(app, monkeypatch, tmp_path):
+    main, fake = app
+    videos = {vid: {"manual": {"en": make_snippets(30, topic=vid)}} for vid in ("batchvid001", "batchvid002")}
+    monkeypatch.setattr(main.transcript_engine, "provider", FakeTranscriptProvider(videos, latency=0))
+    path = tmp_path / "playlists.json"
+    path.write_text(json.dumps({"course": ["batchvid002", "https://www.youtube.com/watch?v=batchvid001"]}))
+    monkeypatch.setattr(main, "playlists", LocalPlaylistResolver(str(path)))
+
+    response = request(main, "POST", "/api/batch", json={"urls": ["not a url"], "playlists": ["course", "gone"]})
+    events = sse_events(response.text)
+    kinds = [kind for kind, _ in events]
+    assert kinds[:2] == ["playlist-error", "start"] and kinds[-1] == "done"
+    assert events[0][1]["playlist"] == "gone"
+    assert events[-1][1]["total"] == 3
+    assert {k: events[-1][1][k] for k in ("succeeded", "failed")} == {"succeeded": 2, "failed": 1}
+
+
+def test_batch_endpoint_needs_a_source(app):
+    main, _ = app
+    assert request(main, "POST", "/api/batch", json={"urls": []}).status_code == 422
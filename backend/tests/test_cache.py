@@ -0,0 +1,195 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import SingleFlight, TieredCache, speculative
+from scheduler import PRIORITY_BULK, PRIORITY_DEFAULT, PRIORITY_INTERACTIVE, RateLimiter
+
+
+def test_disk_tier_round_trip(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = TieredCache(db_path=path)
+    asyncio.run(writer.aset("k", {"a": [1, 2]}))
+    reader = TieredCache(db_path=path)
+    assert asyncio.run(reader.aget("k")) == {"a": [1, 2]}
+    assert reader.stats["disk_hits"] == 1
+    # promoted, so the second read is a memory hit
+    assert asyncio.run(reader.aget("k")) == {"a": [1, 2]}
+    assert reader.stats["memory_hits"] == 1
+    assert asyncio.run(reader.aget("missing")) is None
+    assert reader.stats["misses"] == 1
+
+
+def test_load_applies_to_disk_reads_only(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    value = {"n": 1}
+    cache = TieredCache(db_path=path)
+    cache.set("k", value, dump=lambda v: {"dumped": v["n"]})
+    assert cache.get("k", load=lambda d: ("loaded", d)) is value
+    disk_only = TieredCache(max_entries=0, db_path=path)
+    assert asyncio.run(disk_only.aget("k", load=lambda d: ("loaded", d))) == ("loaded", {"dumped": 1})
+
+
+def test_contains_skips_expired(tmp_path):
+    cache = TieredCache(max_entries=0, db_path=str(tmp_path / "cache.sqlite3"))
+    cache.set("live", 1)
+    cache.set("stale", 1, ttl=-1)
+    assert asyncio.run(cache.acontains("live"))
+    assert not asyncio.run(cache.acontains("stale"))
+    assert not cache.contains("missing")
+
+
+def test_locked_disk_tier_skips_the_write(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache(db_path=path)
+    cache.disk._conn.execute("PRAGMA busy_timeout=50")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        asyncio.run(cache.aset("k", 1))
+    finally:
+        other.execute("COMMIT")
+    assert cache.stats["disk_errors"] == 1
+    # the memory tier still has it
+    assert cache.get("k") == 1
+    assert not TieredCache(db_path=path).contains("k")
+
+
+def test_purge_drops_expired_rows_and_trims_to_the_byte_cap(tmp_path):
+    cache = TieredCache(db_path=str(tmp_path / "cache.sqlite3"))
+    cache.set("stale", "x" * 10, ttl=-1)
+    for i in range(5):
+        # later entries expire later, so they are the ones kept
+        cache.set(f"k{i}", "x" * 98, ttl=100 + i)
+    # each value is stored as a 100-char JSON string
+    assert asyncio.run(cache.purge(max_bytes=250)) == 4
+    assert cache.stats["purged"] == 4
+    rows = cache.disk._conn.execute("SELECT key FROM cache ORDER BY key").fetchall()
+    assert rows == [("k3",), ("k4",)]
+    assert asyncio.run(cache.purge()) == 0
+
+
+
+def test_update_from_two_processes_loses_nothing(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    caches = [TieredCache(max_entries=0, db_path=path) for _ in range(2)]
+
+    def increment(index):
+        for _ in range(25):
+            caches[index % 2].update("count", lambda current: (current or 0) + 1)
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(increment, range(4)))
+    assert caches[0].get("count") == 100
+    # None from the change keeps the entry
+    assert caches[1].update("count", lambda current: None) is None
+    assert caches[1].get("count") == 100
+
+class Work:
+    """Shared work that runs until released and records whether it finished or was cancelled"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.outcome = None
+
+    async def __call__(self):
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.outcome = "cancelled"
+            raise
+        self.outcome = "finished"
+        return "done"
+
+
+async def speculate(flights, key, work):
+    token = speculative.set(True)
+    try:
+        return asyncio.ensure_future(flights.do(key, work))
+    finally:
+        speculative.reset(token)
+
+
+def test_speculative_work_is_cancelled_when_its_last_caller_leaves():
+    async def run():
+        flights, work = SingleFlight(), Work()
+        first = await speculate(flights, "k", work)
+        second = await speculate(flights, "k", work)
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert work.outcome is None
+        second.cancel()
+        await asyncio.sleep(0.01)
+        return work.outcome, flights.stats["cancelled"], flights.pending("k")
+    assert asyncio.run(run()) == ("cancelled", 1, False)
+
+
+def test_real_caller_joining_keeps_speculative_work_running():
+    async def run():
+        flights, work = SingleFlight(), Work()
+        prefetch = await speculate(flights, "k", work)
+        await asyncio.sleep(0)
+        caller = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0)
+        prefetch.cancel()
+        await asyncio.sleep(0)
+        work.release.set()
+        return await caller, work.outcome, flights.stats["cancelled"]
+    assert asyncio.run(run()) == ("done", "finished", 0)
+
+
+def test_urgent_caller_joining_moves_queued_work_up():
+    async def run():
+        limiter = RateLimiter(rpm=100, tpm=100_000, max_concurrency=1)
+        flights = SingleFlight()
+        busy = await limiter.acquire(PRIORITY_DEFAULT, 10)
+        order = []
+
+        async def call(name, priority):
+            ticket = await limiter.acquire(priority, 10)
+            order.append(name)
+            limiter.release(ticket)
+            return name
+
+        prefetch = asyncio.ensure_future(flights.do("k", lambda: call("prefetch", PRIORITY_BULK), PRIORITY_BULK))
+        other = asyncio.ensure_future(call("other", PRIORITY_DEFAULT))
+        await asyncio.sleep(0)
+        # the user now asks for what is being prefetched
+        clicked = asyncio.ensure_future(flights.do("k", lambda: call("duplicate", PRIORITY_INTERACTIVE),
+                                                   PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        limiter.release(busy)
+        results = await asyncio.gather(prefetch, other, clicked)
+        return order, results, flights.stats["promoted"]
+    order, results, promoted = asyncio.run(run())
+    assert order == ["prefetch", "other"]
+    assert results == ["prefetch", "other", "prefetch"]
+    assert promoted == 1
+
+
+def test_promotion_reaches_work_started_for_a_shared_task():
+    async def run():
+        limiter = RateLimiter(rpm=100, tpm=100_000, max_concurrency=1)
+        flights = SingleFlight()
+        busy = await limiter.acquire(PRIORITY_DEFAULT, 10)
+        order = []
+
+        async def call(name, priority):
+            ticket = await limiter.acquire(priority, 10)
+            order.append(name)
+            limiter.release(ticket)
+            return name
+
+        async def outer():
+            # e.g. a translation whose canonical artifact is still being generated
+            return await flights.do("inner", lambda: call("inner", PRIORITY_BULK), PRIORITY_BULK)
+
+        prefetch = asyncio.ensure_future(flights.do("outer", outer, PRIORITY_BULK))
+        other = asyncio.ensure_future(call("other", PRIORITY_DEFAULT))
+        await asyncio.sleep(0.01)
+        clicked = asyncio.ensure_future(flights.do("outer", outer, PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        limiter.release(busy)
+        await asyncio.gather(prefetch, other, clicked)
+        return order
+    assert asyncio.run(run()) == ["inner", "other"]
@@ -0,0 +1,53 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.fakes import FakeAsyncGroq
+from cache import TieredCache
+from chat import ChatMemory
+from llm import LLMGateway
+
+
+def worker_memory(path, latency=0.0, **kwargs):
+    """ChatMemory as one server worker sees it: its own gateway and connection to the shared database"""
+    gateway = LLMGateway(FakeAsyncGroq(latency=latency, content="They asked about the update rule."))
+    return ChatMemory(gateway, TieredCache(max_entries=0, db_path=path), **kwargs)
+
+
+def history(count):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i}"} for i in range(count)]
+
+
+def test_turns_recorded_by_two_workers_at_once_are_all_kept(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    workers = [worker_memory(path, recent_turns=100, fold_batch=100) for _ in range(2)]
+    session = asyncio.run(workers[0].session(None, "video"))
+
+    def chat(index):
+        async def run():
+            for turn in range(10):
+                await workers[index % 2].record(session, f"question {index}.{turn}", "answer")
+        asyncio.run(run())
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(chat, range(4)))
+    stored = asyncio.run(workers[1].session(session["id"], "video"))
+    assert len(stored["turns"]) == 80
+
+
+def test_fold_keeps_turns_another_worker_recorded_meanwhile(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    folding = worker_memory(path, latency=0.2, recent_turns=2, fold_batch=2)
+    other = worker_memory(path, recent_turns=2, fold_batch=100)
+
+    async def run():
+        # four seeded turns: the first two are folded in the background
+        session = await folding.session(None, "video", history(4))
+        # let the fold read the session and start its completion
+        await asyncio.sleep(0.05)
+        await other.record(session, "a question asked during the fold", "its answer")
+        await asyncio.gather(*folding._folds.values())
+        return await other.session(session["id"], "video")
+    stored = asyncio.run(run())
+    assert stored["summary"] == "They asked about the update rule."
+    assert stored["folded"] == 2
+    assert [t["content"] for t in stored["turns"]] == ["turn 2", "turn 3", "a question asked during the fold",
+                                                       "its answer"]
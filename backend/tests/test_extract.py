@@ -0,0 +1,80 @@
+import pytest
+
+from extract import bullet_lines, extract_json, extract_parts, validate_part
+
+QUESTIONS = '{"questions": [{"question": "What is a gradient?", "answer": "A vector of partial derivatives"}]}'
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('[1, 2]', [1, 2]),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('Sure! Here it is:\n{"a": 1}\nHope that helps.', {"a": 1}),
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ('{"a": 1 "b": 2}', {"a": 1, "b": 2}),
+    ("{'a': 'it\\'s'}", {"a": "it's"}),
+    ('{a: 1, b-c: 2}', {"a": 1, "b-c": 2}),
+    ('{"a": True, "b": None}', {"a": True, "b": None}),
+    ('{"a": "line one\nline two"}', {"a": "line one\nline two"}),
+])
+def test_repairs(raw, expected):
+    assert extract_json(raw) == expected
+
+
+def test_no_json():
+    assert extract_json("I cannot help with that.") is None
+    assert extract_json("") is None
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"title": "T", "bullets": ["one", "tw', {"title": "T", "bullets": ["one"]}),
+    ('{"title": "T", "count": 12', {"title": "T"}),
+    ('{"title": "T", "done": tr', {"title": "T"}),
+    ('[{"id": "1", "text": "a"}, {"id": "2"', [{"id": "1", "text": "a"}, {"id": "2"}]),
+])
+def test_truncated_reply_keeps_complete_fields(raw, expected):
+    assert extract_json(raw) == expected
+
+
+@pytest.mark.parametrize("prefix", [
+    "Here are the questions [4 total]:\n",
+    "Summary of {video}:\n",
+    "Notes [see below] and {placeholders} first.\n",
+    "```json\n[draft]\n",
+])
+def test_brackets_in_prose_before_the_json(prefix):
+    assert extract_json(prefix + QUESTIONS) == extract_json(QUESTIONS)
+
+
+def test_longest_value_wins_over_later_fragment():
+    assert extract_json('{"questions": [{"question": "q", "answer": "a"}]} then [1]') == {
+        "questions": [{"question": "q", "answer": "a"}]
+    }
+
+
+def test_brackets_in_prose_do_not_discard_parts():
+    parts = extract_parts("Here are the questions [4 total]:\n" + QUESTIONS, ["questions"])
+    assert parts["questions"][0]["answer"] == "A vector of partial derivatives"
+
+
+def test_extract_parts_takes_bare_value_as_the_single_part():
+    assert extract_parts('[{"id": 1, "text": "First"}]', ["keyPoints"]) == {"keyPoints": [{"id": "1", "text": "First"}]}
+    summary = extract_parts('{"title": "T", "paragraphs": ["p"]}', ["summary"])
+    assert summary == {"summary": {"title": "T", "paragraphs": ["p"], "bullets": []}}
+
+
+def test_extract_parts_reads_bullet_lists_as_keypoints():
+    assert bullet_lines("- one\n* two\n\n• three") == ["one", "two", "three"]
+    assert extract_parts("- one\n- two", ["keyPoints"]) == {"keyPoints": [{"id": "1", "text": "one"}, {"id": "2", "text": "two"}]}
+
+
+def test_extract_parts_leaves_out_invalid_parts():
+    raw = '{"summary": {"title": "T"}, "keyPoints": ["a", ""], "questions": [{"question": "q"}]}'
+    assert extract_parts(raw, ["summary", "keyPoints", "questions"]) == {"keyPoints": [{"id": "1", "text": "a"}]}
+
+
+def test_validate_part_normalizes():
+    assert validate_part("summary", {"summary": {"bullets": [" b ", ""]}}) == {"title": "Summary", "paragraphs": [], "bullets": ["b"]}
+    question = validate_part("questions", [{"question": "q", "answer": "a", "difficulty": "Impossible"}])
+    assert question == [{"id": "1", "question": "q", "answer": "a", "difficulty": "medium"}]
+    assert validate_part("keyPoints", "not a list") is None
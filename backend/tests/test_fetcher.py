@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from bench.fakes import FakeTranscriptNotFound, make_snippets
+from cache import TieredCache
+from fetcher import TranscriptFetchEngine
+
+
+class ScriptedProvider:
+    """Direct fetches answer per language list after `delays[language]` seconds, or fail when it is None"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.calls = []
+
+    def fetch(self, video_id, languages):
+        self.calls.append(languages[0])
+        delay = self.delays.get(languages[0])
+        if delay is None:
+            raise FakeTranscriptNotFound(f"no {languages[0]} transcript")
+        time.sleep(delay)
+        return make_snippets(3, topic=languages[0])
+
+    def list(self, video_id):
+        self.calls.append("list")
+        raise FakeTranscriptNotFound("captions disabled")
+
+    def close(self):
+        pass
+
+
+def fetch(engine, video_id):
+    async def run():
+        started = time.perf_counter()
+        store = await engine.fetch(video_id)
+        return store, time.perf_counter() - started
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def engine_for():
+    engines = []
+
+    def make(delays, **kwargs):
+        provider = ScriptedProvider(delays)
+        engine = TranscriptFetchEngine(provider, TieredCache(), **kwargs)
+        engines.append(engine)
+        return engine, provider
+    yield make
+    for engine in engines:
+        engine.close()
+
+
+def test_slow_strategy_is_hedged_and_the_winner_remembered(engine_for):
+    engine, provider = engine_for({"en": 1.0, "hi": 0.0}, hedge_delay=0.05)
+    store, elapsed = fetch(engine, "v1")
+    assert store.text.startswith("hi sentence")
+    assert elapsed < 0.5
+    assert provider.calls == ["en", "hi"]
+
+    provider.calls.clear()
+    store, _ = fetch(engine, "v1")
+    assert provider.calls == ["hi"]
+    assert engine.stats["memo_hits"] == 1
+
+
+def test_winning_strategy_is_shared_through_the_disk_tier(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = TranscriptFetchEngine(ScriptedProvider({"hi": 0.0}), TieredCache(db_path=path), hedge_delay=0.01)
+    assert fetch(first, "v1")[0] is not None
+    first.close()
+    # another worker process: the strategy is read from disk, off the event loop
+    provider = ScriptedProvider({"hi": 0.0})
+    second = TranscriptFetchEngine(provider, TieredCache(max_entries=0, db_path=path), hedge_delay=0.01)
+    assert fetch(second, "v1")[0] is not None
+    second.close()
+    assert provider.calls == ["hi"]
+    assert second.stats["memo_hits"] == 1
+
+
+def test_failed_strategy_starts_the_next_without_waiting_for_the_hedge(engine_for):
+    engine, provider = engine_for({"hi": 0.0}, hedge_delay=5.0)
+    store, elapsed = fetch(engine, "v1")
+    assert store.text.startswith("hi sentence")
+    assert elapsed < 1.0
+    assert engine.stats["failures"] == 1
+
+
+def test_cancelled_fetch_drops_attempts_still_queued(engine_for):
+    # one thread: "en" holds it past the hedge delay, so "hi" is queued behind it when the caller gives up
+    engine, provider = engine_for({"en": 0.3, "hi": 0.0}, hedge_delay=0.05, max_workers=1)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(engine.fetch("v1"), 0.15)
+        await asyncio.sleep(0.3)
+    asyncio.run(run())
+    assert provider.calls == ["en"]
+
+
+def test_missing_transcript_is_remembered(engine_for):
+    engine, provider = engine_for({}, hedge_delay=0.01)
+    assert fetch(engine, "v1")[0] is None
+    calls = len(provider.calls)
+    assert fetch(engine, "v1")[0] is None
+    assert len(provider.calls) == calls
+    assert engine.stats["negative_hits"] == 1
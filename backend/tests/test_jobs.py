@@ -0,0 +1,213 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobStore, webhook_error
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.open()
+    yield store
+    store.close()
+
+
+async def settled(store, job_id, status, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while store.get(job_id)["status"] != status:
+        assert time.monotonic() < deadline, store.get(job_id)
+        await asyncio.sleep(0.01)
+    return store.get(job_id)
+
+
+class Runner:
+    """Job runner that records each run, reports one progress stage and can be held or made to fail"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.runs = []
+        self.release = None
+
+    async def __call__(self, job, progress):
+        self.runs.append(job["id"])
+        progress("transcript", {"videoId": job["payload"]["videoId"]})
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            raise RuntimeError("boom")
+        return {"summary": job["payload"]["videoId"]}
+
+
+def test_job_runs_and_reports_progress(store):
+    runner = Runner()
+
+    async def run():
+        queue = JobQueue(store, runner, workers=2)
+        queue.start()
+        job, deduplicated = queue.submit("v1:en", {"videoId": "v1"})
+        assert not deduplicated and job["status"] == QUEUED
+        events = queue.subscribe(job["id"])
+        finished = await settled(store, job["id"], SUCCEEDED)
+        await queue.stop()
+        received = []
+        while not events.empty():
+            received.append(events.get_nowait()[0])
+        return finished, received
+    finished, received = asyncio.run(run())
+    assert finished["result"] == {"summary": "v1"}
+    assert received == ["status", "progress", "done"]
+
+
+def test_failed_job_keeps_its_error(store):
+    async def run():
+        queue = JobQueue(store, Runner(fail=True))
+        queue.start()
+        job, _ = queue.submit("v1:en", {"videoId": "v1"})
+        finished = await settled(store, job["id"], FAILED)
+        await queue.stop()
+        return finished
+    finished = asyncio.run(run())
+    assert finished["error"] == "boom"
+    # the partial result written by progress() is kept
+    assert finished["result"] == {"videoId": "v1"}
+
+
+def test_submit_deduplicates_unfinished_and_recent_jobs(store):
+    runner = Runner()
+
+    async def run():
+        queue = JobQueue(store, runner, reuse_seconds=3600)
+        queue.start()
+        first, _ = queue.submit("v1:en", {"videoId": "v1"})
+        again, deduplicated = queue.submit("v1:en", {"videoId": "v1"})
+        assert deduplicated and again["id"] == first["id"]
+        other, deduplicated = queue.submit("v1:hi", {"videoId": "v1"})
+        assert not deduplicated and other["id"] != first["id"]
+        await settled(store, first["id"], SUCCEEDED)
+        reused, deduplicated = queue.submit("v1:en", {"videoId": "v1"})
+        assert deduplicated and reused["id"] == first["id"]
+        await queue.stop()
+    asyncio.run(run())
+    assert len(runner.runs) == 2
+
+
+def test_simultaneous_submissions_from_two_processes_share_one_job(store):
+    other_store = JobStore(store.path)
+    other_store.open()
+    start = threading.Barrier(8)
+
+    def submit(job_store):
+        start.wait()
+        return job_store.find_or_create("v1:en", {"videoId": "v1"}, time.time() - 60)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(submit, [store, other_store] * 4))
+    other_store.close()
+    assert len({job["id"] for job, _ in results}) == 1
+    assert sorted(deduplicated for _, deduplicated in results) == [False] + [True] * 7
+    assert store.counts() == {QUEUED: 1}
+
+
+def test_failed_job_is_not_reused(store):
+    async def run():
+        queue = JobQueue(store, Runner(fail=True))
+        queue.start()
+        first, _ = queue.submit("v1:en", {"videoId": "v1"})
+        await settled(store, first["id"], FAILED)
+        retry, deduplicated = queue.submit("v1:en", {"videoId": "v1"})
+        await queue.stop()
+        return first, retry, deduplicated
+    first, retry, deduplicated = asyncio.run(run())
+    assert not deduplicated and retry["id"] != first["id"]
+
+
+def test_waiting_jobs_resume_on_start(store):
+    job = store.create("v1:en", {"videoId": "v1"})
+    runner = Runner()
+
+    async def run():
+        queue = JobQueue(store, runner)
+        queue.start()
+        await settled(store, job["id"], SUCCEEDED)
+        await queue.stop()
+        return queue.stats["resumed"]
+    assert asyncio.run(run()) == 1
+    assert runner.runs == [job["id"]]
+
+
+def test_expired_lease_is_taken_over_but_a_live_one_is_not(store):
+    dead = store.claim(store.create("dead:en", {"videoId": "dead"})["id"])
+    live = store.claim(store.create("live:en", {"videoId": "live"})["id"])
+    # the process running "dead" stopped renewing its lease two minutes ago
+    store._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - 120, dead["id"]))
+    runner = Runner()
+
+    async def run():
+        queue = JobQueue(store, runner, lease_seconds=60)
+        queue.start()
+        await settled(store, dead["id"], SUCCEEDED)
+        await queue.stop()
+    asyncio.run(run())
+    assert runner.runs == [dead["id"]]
+    assert store.get(live["id"])["status"] == RUNNING
+
+
+def test_stop_requeues_running_jobs(store):
+    runner = Runner()
+
+    async def run():
+        runner.release = asyncio.Event()
+        queue = JobQueue(store, runner)
+        queue.start()
+        job, _ = queue.submit("v1:en", {"videoId": "v1"})
+        await settled(store, job["id"], RUNNING)
+        assert queue.runs_here(job["id"])
+        await queue.stop()
+        return job
+    job = asyncio.run(run())
+    assert store.get(job["id"])["status"] == QUEUED
+
+
+def test_job_queued_in_two_processes_runs_once(store):
+    other_store = JobStore(store.path)
+    other_store.open()
+    runner = Runner()
+
+    async def run():
+        first = JobQueue(store, runner)
+        first.start()
+        runner.release = asyncio.Event()
+        job, _ = first.submit("v1:en", {"videoId": "v1"})
+        # a second process starting now queues the same waiting job
+        second = JobQueue(other_store, runner)
+        second.start()
+        await settled(store, job["id"], RUNNING)
+        runner.release.set()
+        await settled(store, job["id"], SUCCEEDED)
+        await asyncio.sleep(0.05)
+        await first.stop()
+        await second.stop()
+        return first.stats["lost_claims"] + second.stats["lost_claims"]
+    assert asyncio.run(run()) == 1
+    assert len(runner.runs) == 1
+    other_store.close()
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.0.0.5/hook",
+    "http://[::ffff:127.0.0.1]/hook",
+    "ftp://example.com/hook",
+])
+def test_webhooks_to_internal_addresses_are_refused(url):
+    assert asyncio.run(webhook_error(url)) is not None
+
+
+def test_allowlisted_webhook_hosts_are_trusted():
+    assert asyncio.run(webhook_error("http://10.0.0.5/hook", ["10.0.0.5"])) is None
+    assert asyncio.run(webhook_error("https://hooks.example.com/x", [".example.com"])) is None
+    assert asyncio.run(webhook_error("https://evil.test/x", [".example.com"])) is not None
@@ -0,0 +1,43 @@
+from bench.fakes import FakeTranscriptProvider, make_snippets
+from conftest import request
+
+
+def translations(fake, since=0):
+    return ["Translate every string" in r["prompt"] for r in fake.requests[since:]]
+
+
+def test_language_switch_after_process_video_only_translates(app, monkeypatch):
+    main, fake = app
+    video_id = "localize001"
+    videos = {video_id: {"manual": {"en": make_snippets(60, topic="localize")}}}
+    monkeypatch.setattr(main.transcript_engine, "provider", FakeTranscriptProvider(videos, latency=0))
+
+    # what the app does when a video is opened: process it, then ask for questions
+    processed = request(main, "POST", "/api/process-video",
+                        json={"url": f"https://www.youtube.com/watch?v={video_id}", "language": "en"}).json()
+    request(main, "POST", "/api/questions", json={"transcriptId": processed["transcriptId"], "language": "en"})
+    before = len(fake.requests)
+
+    switched = request(main, "POST", "/api/study-pack",
+                       json={"transcriptId": processed["transcriptId"], "language": "hi"}).json()
+    assert translations(fake, before) == [True, True, True]
+    assert switched["origin"] == {"summary": "translated", "keyPoints": "translated", "questions": "translated"}
+    # the summary the user was reading, translated (the fake marks translated strings with "~")
+    assert switched["summary"]["title"] == "~" + processed["summary"]["title"]
+    assert [p["text"] for p in switched["keyPoints"]] == ["~" + p["text"] for p in processed["keyPoints"]]
+
+    # process-video in that language reuses the same translations
+    again = request(main, "POST", "/api/process-video",
+                    json={"url": f"https://www.youtube.com/watch?v={video_id}", "language": "hi"}).json()
+    assert again["summary"] == switched["summary"]
+    assert len(fake.requests) == before + 3
+
+
+def test_study_pack_language_switch_translates_its_own_parts(app):
+    main, fake = app
+    transcript = " ".join(f"pack sentence {i}." for i in range(300))
+    english = request(main, "POST", "/api/study-pack", json={"transcript": transcript, "language": "en"}).json()
+    assert len(fake.requests) == 1
+    hindi = request(main, "POST", "/api/study-pack", json={"transcript": transcript, "language": "hi"}).json()
+    assert translations(fake, 1) == [True, True, True]
+    assert hindi["summary"]["title"] == "~" + english["summary"]["title"]
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from bench.fakes import FakeAPIError, FakeAsyncGroq, smart_reply
+from conftest import request
+from llm import DEFAULT_MODEL, LLMGateway
+from routing import FAST_MODEL, ModelRouter
+
+TRANSCRIPT = "The lecturer derives the gradient descent update rule and works an example. "
+
+
+def by_model(**failures):
+    """Fake client that fails calls to the models named in `failures` (model=error) and answers the rest"""
+    fake = FakeAsyncGroq(latency=0, content=smart_reply)
+    fake.injected_failure = lambda: failures.get(fake.requests[-1]["model"])
+    return fake
+
+
+def gateway(fake, **kwargs):
+    return LLMGateway(fake, max_retries=0, router=ModelRouter.tiered(DEFAULT_MODEL, FAST_MODEL, **kwargs))
+
+
+def test_fast_tasks_run_on_the_fast_model_and_escalate_to_the_large_one():
+    fake = by_model()
+    routed = gateway(fake)
+
+    async def run():
+        first = await routed.complete("Extract the key points", max_tokens=10, task="keypoints")
+        again = await routed.complete("Extract the key points", max_tokens=10, task="keypoints", escalate=True)
+        summary = await routed.complete("clean JSON summary", max_tokens=10, task="summary")
+        return first, again, summary
+    first, again, summary = asyncio.run(run())
+    assert (first.model, first.reason) == (FAST_MODEL, "primary")
+    assert (again.model, again.reason) == (DEFAULT_MODEL, "escalated")
+    assert (summary.model, summary.reason) == (DEFAULT_MODEL, "primary")
+    assert [r["model"] for r in fake.requests] == [FAST_MODEL, DEFAULT_MODEL, DEFAULT_MODEL]
+
+
+def test_rate_limited_model_falls_back_to_the_other_tier():
+    fake = by_model(**{FAST_MODEL: FakeAPIError(429, retry_after=0)})
+    result = asyncio.run(gateway(fake, primary_retries=0).complete("hi", max_tokens=10, task="translate"))
+    assert result.fallback and result.model == DEFAULT_MODEL
+    assert [r["model"] for r in fake.requests] == [FAST_MODEL, DEFAULT_MODEL]
+
+
+def test_bad_request_does_not_fall_back():
+    fake = by_model(**{DEFAULT_MODEL: FakeAPIError(400)})
+    with pytest.raises(FakeAPIError):
+        asyncio.run(gateway(fake).complete("hi", max_tokens=10, task="summary"))
+    assert [r["model"] for r in fake.requests] == [DEFAULT_MODEL]
+
+
+def test_slow_model_falls_back_after_the_deadline():
+    router = ModelRouter.tiered(DEFAULT_MODEL, FAST_MODEL, fallback_after=0.05)
+
+    async def call(model, retries):
+        if model == DEFAULT_MODEL:
+            await asyncio.sleep(5)
+        return f"from {model}"
+    result = asyncio.run(router.run("summary", False, call))
+    assert (str(result), result.reason) == (f"from {FAST_MODEL}", "fallback")
+    assert router.stats["summary"] == {f"primary:{DEFAULT_MODEL}": 1, f"fallback:{FAST_MODEL}": 1}
+
+
+def test_one_model_means_no_routing():
+    router = ModelRouter.tiered(DEFAULT_MODEL, DEFAULT_MODEL)
+    assert router.model_for("keypoints") == DEFAULT_MODEL
+    assert router.route("keypoints").fallback is None
+
+
+@pytest.fixture
+def routed_app(app, monkeypatch):
+    """The `app` fixture's fake behind a gateway with the production two-tier router"""
+    main, fake = app
+    routed = gateway(fake)
+    for owner in (main, main.summarizer, main.translator, main.chat_memory):
+        monkeypatch.setattr(owner, "llm", routed)
+    return main, fake
+
+
+def test_invalid_fast_reply_is_asked_again_of_the_large_model(routed_app):
+    main, fake = routed_app
+    replies = iter(['{"keyPoints": []}'])
+    fake.content = lambda prompt: next(replies, None) or smart_reply(prompt)
+    transcript = "Escalation: " + TRANSCRIPT * 20
+
+    response = request(main, "POST", "/api/keypoints", json={"transcript": transcript, "language": "en"})
+    assert response.status_code == 200 and response.json()["keyPoints"]
+    assert [r["model"] for r in fake.requests] == [FAST_MODEL, DEFAULT_MODEL]
+
+
+def test_fallback_output_is_served_but_not_cached(routed_app, monkeypatch):
+    main, fake = routed_app
+    monkeypatch.setattr(main.llm.router, "primary_retries", 0)
+    fake.injected_failure = lambda: FakeAPIError(429, retry_after=0) if fake.requests[-1]["model"] == FAST_MODEL else None
+    transcript = "Fallback: " + TRANSCRIPT * 20
+
+    for _ in range(2):
+        response = request(main, "POST", "/api/keypoints", json={"transcript": transcript, "language": "en"})
+        assert response.json()["keyPoints"]
+    # each request went to the fast model and then to the large one, since nothing was cached
+    assert [r["model"] for r in fake.requests] == [FAST_MODEL, DEFAULT_MODEL] * 2
+
+
+def test_study_pack_parts_are_not_cached_under_fast_model_keys(routed_app):
+    main, fake = routed_app
+    transcript = "Study pack routing: " + TRANSCRIPT * 20
+    pack = request(main, "POST", "/api/study-pack", json={"transcript": transcript, "language": "en"}).json()
+    assert set(pack["origin"].values()) == {"generated"}
+    assert [r["model"] for r in fake.requests] == [DEFAULT_MODEL]
+
+    # the standalone endpoint names the fast model, so it makes its own key points
+    request(main, "POST", "/api/keypoints", json={"transcript": transcript, "language": "en"})
+    assert [r["model"] for r in fake.requests] == [DEFAULT_MODEL, FAST_MODEL]
+    # while the pack is served from its own parts
+    again = request(main, "POST", "/api/study-pack", json={"transcript": transcript, "language": "en"}).json()
+    assert set(again["origin"].values()) == {"cache"}
+    assert len(fake.requests) == 2
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pytest
+
+import llm
+from bench.fakes import FakeAPIError, FakeAsyncGroq
+from llm import LLMGateway
+from scheduler import (
+    PRIORITY_BULK,
+    PRIORITY_DEFAULT,
+    PRIORITY_INTERACTIVE,
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimiter,
+)
+
+
+def scripted(fake: FakeAsyncGroq, *failures):
+    """Make `fake` fail its first calls with `failures` (None for a success), then succeed"""
+    queue = list(failures)
+    fake.injected_failure = lambda: queue.pop(0) if queue else None
+    return fake
+
+
+def test_interactive_calls_overtake_queued_bulk_work():
+    async def run():
+        limiter = RateLimiter(rpm=100, tpm=100_000, max_concurrency=1)
+        busy = await limiter.acquire(PRIORITY_DEFAULT, 10)
+        order = []
+
+        async def call(name, priority):
+            ticket = await limiter.acquire(priority, 10)
+            order.append(name)
+            limiter.release(ticket)
+
+        tasks = [asyncio.ensure_future(call(name, priority)) for name, priority in
+                 [("bulk", PRIORITY_BULK), ("default", PRIORITY_DEFAULT), ("interactive", PRIORITY_INTERACTIVE)]]
+        await asyncio.sleep(0)
+        assert limiter.waiting(PRIORITY_BULK) == 3
+        limiter.release(busy)
+        await asyncio.gather(*tasks)
+        return order
+    assert asyncio.run(run()) == ["interactive", "default", "bulk"]
+
+
+def test_requests_per_minute_budget():
+    async def run():
+        limiter = RateLimiter(rpm=2, tpm=100_000)
+        for _ in range(2):
+            limiter.release(await limiter.acquire(PRIORITY_DEFAULT, 10))
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire(PRIORITY_INTERACTIVE, 10, timeout=0.05)
+        assert limiter.snapshot()["window_requests"] == 2
+    asyncio.run(run())
+
+
+def test_tokens_per_minute_budget_uses_actual_usage():
+    async def run():
+        limiter = RateLimiter(rpm=100, tpm=100)
+        first = await limiter.acquire(PRIORITY_DEFAULT, 60)
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire(PRIORITY_DEFAULT, 60, timeout=0.05)
+        # the call used far less than estimated, which frees room in the window
+        limiter.release(first, actual_tokens=10)
+        limiter.release(await limiter.acquire(PRIORITY_DEFAULT, 60, timeout=0.05))
+        assert limiter.snapshot()["window_tokens"] == 70
+    asyncio.run(run())
+
+
+def test_call_larger_than_the_budget_runs_in_an_empty_window():
+    async def run():
+        limiter = RateLimiter(rpm=100, tpm=100)
+        limiter.release(await limiter.acquire(PRIORITY_DEFAULT, 500, timeout=0.05))
+    asyncio.run(run())
+
+
+def test_block_for_holds_admissions():
+    async def run():
+        limiter = RateLimiter()
+        limiter.block_for(0.1)
+        started = time.monotonic()
+        limiter.release(await limiter.acquire(PRIORITY_INTERACTIVE, 10))
+        return time.monotonic() - started
+    assert asyncio.run(run()) >= 0.09
+
+
+def test_circuit_breaker_opens_and_probes_after_cooldown():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    # a failed probe opens it again straight away
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm, "backoff_delay", lambda attempt: 0.0)
+
+
+def test_gateway_retries_429_after_retry_after(no_backoff):
+    fake = scripted(FakeAsyncGroq(latency=0, content="ok"), FakeAPIError(429, retry_after=0.05))
+    gateway = LLMGateway(fake)
+    started = time.monotonic()
+    assert asyncio.run(gateway.complete("hi", max_tokens=10)) == "ok"
+    assert time.monotonic() - started >= 0.05
+    assert fake.calls == 2
+    assert gateway.stats["rate_limited"] == 1 and gateway.stats["retries"] == 1
+
+
+def test_gateway_does_not_retry_client_errors(no_backoff):
+    fake = scripted(FakeAsyncGroq(latency=0, content="ok"), FakeAPIError(400))
+    gateway = LLMGateway(fake)
+    with pytest.raises(FakeAPIError):
+        asyncio.run(gateway.complete("hi", max_tokens=10))
+    assert fake.calls == 1
+
+
+def test_open_circuit_rejects_without_calling_the_provider(no_backoff):
+    fake = scripted(FakeAsyncGroq(latency=0, content="ok"), *[FakeAPIError(503)] * 2)
+    gateway = LLMGateway(fake, breaker=CircuitBreaker(threshold=2, cooldown=60), max_retries=1)
+    with pytest.raises(FakeAPIError):
+        asyncio.run(gateway.complete("hi", max_tokens=10))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(gateway.complete("hi", max_tokens=10))
+    assert fake.calls == 2
+    assert gateway.stats["rejected"] == 1
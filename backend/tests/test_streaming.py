@@ -0,0 +1,33 @@
+from conftest import request, sse_events
+
+
+def lecture(tag: str) -> str:
+    return " ".join(f"{tag} lecture sentence {i}." for i in range(200))
+
+
+def test_translated_stream_matches_summary_endpoint(app):
+    main, fake = app
+    transcript = lecture("stream-hi")
+    streamed = request(main, "POST", "/api/summary/stream", json={"transcript": transcript, "language": "hi"})
+    events = sse_events(streamed.text)
+    assert events[-1][0] == "done"
+    # the canonical summary is generated once and translated, never written directly in Hindi
+    prompts = [r["prompt"] for r in fake.requests]
+    assert len(prompts) == 2
+    assert "clean JSON summary" in prompts[0] and "Hindi" not in prompts[0]
+    assert "Translate every string" in prompts[1]
+
+    summary = request(main, "POST", "/api/summary", json={"transcript": transcript, "language": "hi"})
+    assert summary.json() == events[-1][1]
+    assert len(fake.requests) == 2
+
+
+def test_canonical_stream_is_cached_for_summary_endpoint(app):
+    main, fake = app
+    transcript = lecture("stream-en")
+    streamed = request(main, "POST", "/api/summary/stream", json={"transcript": transcript, "language": "en"})
+    events = sse_events(streamed.text)
+    assert [e for e, _ in events][:2] == ["title", "paragraph"]
+    assert fake.requests[0]["stream"]
+    assert request(main, "POST", "/api/summary", json={"transcript": transcript, "language": "en"}).json() == events[-1][1]
+    assert len(fake.requests) == 1
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from metrics import STAGE_SECONDS
+
+# Set per HTTP request by the middleware; copied into tasks spawned while handling it
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, event, request_id and any `extra` fields"""
+
+    RESERVED = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+            "request_id": request_id.get(),
+        }
+        entry.update({k: v for k, v in record.__dict__.items() if k not in self.RESERVED})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+logger = logging.getLogger("backend")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(JSONFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, **fields):
+    logger.log(level, event, extra=fields)
+
+
+@contextmanager
+def span(stage: str, **fields):
+    """Time a pipeline stage: observed in stage_duration_seconds and logged with the request id.
+
+    Yields a dict; set "outcome" on it (default "ok", "error" if the block
+    raises) or add fields to include in the log line.
+    """
+    info = {"outcome": "ok"}
+    start = time.perf_counter()
+    try:
+        yield info
+    except asyncio.CancelledError:
+        # e.g. a hedged strategy that lost the race
+        info["outcome"] = "cancelled"
+        raise
+    except BaseException:
+        info["outcome"] = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=stage, outcome=info["outcome"])
+        extra = {k: v for k, v in info.items() if k != "outcome"}
+        log_event("span", stage=stage, outcome=info["outcome"],
+                  duration_ms=round(seconds * 1000, 1), **fields, **extra)
@@ -0,0 +1,161 @@
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, List
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, ~4 UTF-8 bytes per token (also sane for non-Latin scripts)"""
+    return max(1, len(text.encode("utf-8")) // 4)
+
+
+def format_timestamp(seconds: float) -> str:
+    """12:34 or 1:02:03"""
+    total = int(seconds)
+    hours, rem = divmod(total, 3600)
+    minutes, secs = divmod(rem, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def _snippet_fields(snippet) -> tuple:
+    # youtube-transcript-api returns dicts in 0.6.x and snippet objects in 1.x
+    if isinstance(snippet, dict):
+        return snippet.get("text", ""), float(snippet.get("start", 0.0)), float(snippet.get("duration", 0.0))
+    return snippet.text, float(getattr(snippet, "start", 0.0)), float(getattr(snippet, "duration", 0.0))
+
+
+class SegmentStore:
+    """Compact transcript representation.
+
+    All segment texts live in one space-joined buffer. Parallel typed arrays
+    hold each segment's character offset, start time and duration, so a long
+    video costs one string plus a few bytes per segment.
+    """
+
+    __slots__ = ("text", "offsets", "starts", "durations")
+
+    def __init__(self, text: str, offsets: array, starts: array, durations: array):
+        self.text = text
+        # offsets has one extra sentinel entry: len(text) + 1
+        self.offsets = offsets
+        self.starts = starts
+        self.durations = durations
+
+    @classmethod
+    def from_snippets(cls, snippets: Iterable) -> "SegmentStore":
+        parts: List[str] = []
+        offsets = array("I")
+        starts = array("d")
+        durations = array("d")
+        position = 0
+        for snippet in snippets:
+            text, start, duration = _snippet_fields(snippet)
+            text = " ".join(text.split())
+            if not text:
+                continue
+            offsets.append(position)
+            starts.append(start)
+            durations.append(duration)
+            parts.append(text)
+            position += len(text) + 1
+        offsets.append(position)
+        return cls(" ".join(parts), offsets, starts, durations)
+
+    @classmethod
+    def from_text(cls, text: str) -> "SegmentStore":
+        """Single untimed segment, used for pasted transcripts and placeholders"""
+        text = text.strip()
+        return cls(text, array("I", [0, len(text) + 1]), array("d", [0.0]), array("d", [0.0]))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def segment_text(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1] - 1]
+
+    def span_text(self, first: int, last: int) -> str:
+        """Text of segments first..last inclusive"""
+        return self.text[self.offsets[first]:self.offsets[last + 1] - 1]
+
+    def end_time(self, index: int) -> float:
+        return self.starts[index] + self.durations[index]
+
+    def to_dict(self) -> dict:
+        return {
+            "text": self.text,
+            "offsets": self.offsets.tolist(),
+            "starts": self.starts.tolist(),
+            "durations": self.durations.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SegmentStore":
+        return cls(data["text"], array("I", data["offsets"]), array("d", data["starts"]), array("d", data["durations"]))
+
+
+@dataclass
+class Chunk:
+    text: str
+    first_segment: int
+    last_segment: int
+    start: float
+    end: float
+
+    @property
+    def label(self) -> str:
+        return f"{format_timestamp(self.start)}-{format_timestamp(self.end)}"
+
+
+def _split_long_text(text: str, max_tokens: int) -> List[str]:
+    """Split one oversized piece of text on sentence or word boundaries"""
+    max_bytes = max_tokens * 4
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_bytes, len(text))
+        # shrink the window until it fits the byte budget (multi-byte scripts)
+        while end > start + 1 and len(text[start:end].encode("utf-8")) > max_bytes:
+            end = start + (end - start) * 3 // 4
+        if end < len(text):
+            cut = max(text.rfind(". ", start, end), text.rfind("? ", start, end), text.rfind("! ", start, end))
+            if cut <= start:
+                cut = text.rfind(" ", start, end)
+            if cut > start:
+                end = cut + 1
+        piece = text[start:end].strip()
+        if piece:
+            pieces.append(piece)
+        start = end
+    return pieces
+
+
+def chunk_segments(store: SegmentStore, max_tokens: int) -> List[Chunk]:
+    """Pack consecutive segments into chunks of at most `max_tokens`, keeping time ranges.
+
+    A single segment larger than the budget (e.g. an untimed pasted
+    transcript) is split on sentence boundaries and keeps its time range.
+    """
+    # budget in UTF-8 bytes, matching estimate_tokens; +1 per segment for the joining space
+    budget = max_tokens * 4
+    chunks: List[Chunk] = []
+    first = None
+    used = 0
+    for index in range(len(store)):
+        text = store.segment_text(index)
+        seg_bytes = len(text.encode("utf-8")) + 1
+        if first is not None and used + seg_bytes > budget:
+            chunks.append(Chunk(store.span_text(first, index - 1), first, index - 1,
+                                store.starts[first], store.end_time(index - 1)))
+            first, used = None, 0
+        if seg_bytes > budget:
+            for piece in _split_long_text(text, max_tokens):
+                chunks.append(Chunk(piece, index, index, store.starts[index], store.end_time(index)))
+            continue
+        if first is None:
+            first = index
+        used += seg_bytes
+    if first is not None:
+        last = len(store) - 1
+        chunks.append(Chunk(store.span_text(first, last), first, last, store.starts[first], store.end_time(last)))
+    return chunks
@@ -0,0 +1,113 @@
+import json
+from typing import Any, List, Optional
+
+from cache import SingleFlight, TieredCache, make_key
+from extract import extract_json
+from llm import LLMGateway
+from routing import is_fallback
+from scheduler import PRIORITY_DEFAULT
+from transcripts import estimate_tokens
+
+TRANSLATE_PROMPT_VERSION = 1
+
+# Codes sent by the LanguageSelector; anything else is passed to the model as-is
+LANGUAGE_NAMES = {"en": "English", "hi": "Hindi"}
+
+# Values under these keys are identifiers or enums, never prose
+UNTRANSLATED_KEYS = frozenset({"id", "difficulty", "videoId", "transcriptId"})
+
+
+def language_name(language: str) -> str:
+    return LANGUAGE_NAMES.get(language, language)
+
+
+def collect_strings(value: Any, out: Optional[List[str]] = None) -> List[str]:
+    """Every translatable string in a JSON artifact, in a stable depth-first order"""
+    out = [] if out is None else out
+    if isinstance(value, str):
+        out.append(value)
+    elif isinstance(value, list):
+        for item in value:
+            collect_strings(item, out)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if key not in UNTRANSLATED_KEYS:
+                collect_strings(item, out)
+    return out
+
+
+def replace_strings(value: Any, strings: List[str]) -> Any:
+    """Copy of `value` with its strings taken, in collect_strings order, from `strings`"""
+    if isinstance(value, str):
+        return strings.pop(0)
+    if isinstance(value, list):
+        return [replace_strings(item, strings) for item in value]
+    if isinstance(value, dict):
+        return {key: item if key in UNTRANSLATED_KEYS else replace_strings(item, strings) for key, item in value.items()}
+    return value
+
+
+def parse_string_array(raw: str, expected: int) -> List[str]:
+    strings = extract_json(raw)
+    if not isinstance(strings, list) or len(strings) != expected or not all(isinstance(s, str) for s in strings):
+        raise ValueError(f"Translation reply does not match the source ({expected} strings)")
+    return strings
+
+
+class Translator:
+    """Translates cached canonical artifacts instead of regenerating them from the transcript.
+
+    Only the artifact's strings are sent, as a flat JSON array, so the
+    prompt is a few hundred tokens rather than the whole transcript, and
+    the structure (ids, difficulty levels, list lengths) is rebuilt locally.
+    Results are cached per (source artifact key, language).
+    """
+
+    def __init__(self, llm: LLMGateway, cache: TieredCache, flights: Optional[SingleFlight] = None):
+        self.llm = llm
+        self.cache = cache
+        self.flights = flights or SingleFlight()
+        self.stats = {"hits": 0, "translations": 0, "failures": 0}
+
+    def key(self, source_key: str, language: str) -> str:
+        return make_key("translation", source_key, language, self.llm.model_for("translate"), TRANSLATE_PROMPT_VERSION)
+
+    async def cached(self, source_key: str, language: str) -> Optional[Any]:
+        value = await self.cache.aget(self.key(source_key, language))
+        if value is not None:
+            self.stats["hits"] += 1
+        return value
+
+    async def translate(self, source_key: str, artifact: Any, language: str, **kwargs) -> Any:
+        """`artifact` (stored under `source_key`) rendered in `language`"""
+        cached = await self.cached(source_key, language)
+        if cached is not None:
+            return cached
+        strings = collect_strings(artifact)
+        if not strings:
+            return artifact
+        key = self.key(source_key, language)
+
+        async def run() -> Any:
+            payload = json.dumps(strings, ensure_ascii=False)
+            prompt = f"""
+Translate every string in this JSON array into {language_name(language)}.
+Keep the same number of items, in the same order. Keep numbers, formulas, code and proper names as they are.
+Return ONLY the translated JSON array of strings (no backticks, no extra text).
+
+{payload}
+"""
+            # non-Latin scripts need more tokens than the English source
+            raw = await self.llm.complete(prompt, max_tokens=estimate_tokens(payload) * 3 + 64,
+                                          temperature=0.2, task="translate", **kwargs)
+            try:
+                translated = replace_strings(artifact, parse_string_array(raw, len(strings)))
+            except Exception:
+                self.stats["failures"] += 1
+                raise
+            self.stats["translations"] += 1
+            if not is_fallback(raw):
+                await self.cache.aset(key, translated)
+            return translated
+
+        return await self.flights.do(key, run, kwargs.get("priority", PRIORITY_DEFAULT))
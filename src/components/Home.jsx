@@ -7,7 +7,7 @@ import { QuestionList } from './QuestionList';
 import { MindMap } from './MindMap';
 import { ExtraInfo } from './ExtraInfo';
 import { LanguageSelector } from './LanguageSelector';
-import { processYouTubeVideo, generateQuestions, answerQuestion, generateSummary, extractKeyPoints } from '../services/ai';
+import { processYouTubeVideo, generateQuestions, answerQuestion, generateStudyPack, uploadTranscript } from '../services/ai';
 import { supabase } from '../lib/supabase';
 import { GraduationCap, Sparkles, LogOut } from 'lucide-react';
 
@@ -60,7 +60,7 @@ export function Home() {
       const processedVideo = await processYouTubeVideo(url, selectedLanguage);
       setVideo(processedVideo);
 
-      const generatedQuestions = await generateQuestions(processedVideo.transcript, selectedLanguage);
+      const generatedQuestions = await generateQuestions(processedVideo.transcript, selectedLanguage, processedVideo.transcriptId);
       setQuestions(generatedQuestions);
 
       setNeedsTranscript(!processedVideo.transcript);
@@ -78,11 +78,10 @@ export function Home() {
     if (!pasted) return;
     try {
       setLoading(true);
-      const summary = await generateSummary(pasted, selectedLanguage);
-      const keyPoints = await extractKeyPoints(pasted, selectedLanguage);
-      const updated = { ...video, transcript: pasted, summary, keyPoints };
+      const transcriptId = await uploadTranscript(pasted, video.videoId);
+      const { summary, keyPoints, questions: generatedQuestions } = await generateStudyPack(pasted, selectedLanguage, transcriptId);
+      const updated = { ...video, transcript: pasted, transcriptId, summary, keyPoints, pasted: true };
       setVideo(updated);
-      const generatedQuestions = await generateQuestions(pasted, selectedLanguage);
       setQuestions(generatedQuestions);
       setNeedsTranscript(false);
     } catch (e) {
@@ -131,12 +130,31 @@ export function Home() {
     }
   };
 
+  // The backend translates the cached results, so switching language is cheap once a video is loaded
+  const handleLanguageChange = async (language) => {
+    setSelectedLanguage(language);
+    if (!video?.transcript) return;
+
+    try {
+      setLoading(true);
+      // The server already holds the transcript under transcriptId and translates its cached artifacts,
+      // so a language switch never re-fetches the video.
+      const { summary, keyPoints, questions: localizedQuestions } = await generateStudyPack(video.transcript, language, video.transcriptId);
+      setVideo({ ...video, summary, keyPoints });
+      setQuestions(localizedQuestions);
+    } catch (error) {
+      console.error('Error switching language:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const handleGenerateMoreQuestions = async () => {
     if (!video?.transcript) return;
 
     try {
       setGeneratingMoreQuestions(true);
-      const newQuestions = await generateQuestions(video.transcript, selectedLanguage);
+      const newQuestions = await generateQuestions(video.transcript, selectedLanguage, video.transcriptId);
       
       const questionsWithNewIds = newQuestions.map((q, index) => ({
         ...q,
@@ -215,7 +233,7 @@ export function Home() {
             <div className="flex items-center gap-2">
               <LanguageSelector 
                 selectedLanguage={selectedLanguage} 
-                onLanguageChange={setSelectedLanguage} 
+                onLanguageChange={handleLanguageChange} 
               />
             </div>
           </div>
@@ -1,13 +1,35 @@
 const API_BASE = import.meta.env.VITE_API_BASE || '';
 
-export async function generateSummary(transcript, language = 'en') {
-  if (!transcript.trim()) return 'Transcript not available to summarize.';
-  
-  const res = await fetch(`${API_BASE}/api/summary`, {
+// Prefer the server-side transcript handle; resend the full text only if the handle has expired.
+async function postTranscript(path, transcript, transcriptId, language) {
+  const send = (body) => fetch(`${API_BASE}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ...body, language }),
+  });
+
+  if (transcriptId) {
+    const res = await send({ transcriptId });
+    if (res.status !== 404 || !transcript) return res;
+  }
+  return send({ transcript });
+}
+
+export async function uploadTranscript(transcript, videoId) {
+  const res = await fetch(`${API_BASE}/api/transcripts`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ transcript: transcript, language }),
+    body: JSON.stringify({ transcript, videoId }),
   });
+  if (!res.ok) return null;
+  const data = await res.json();
+  return data.transcriptId || null;
+}
+
+export async function generateSummary(transcript, language = 'en', transcriptId = null) {
+  if (!transcript.trim()) return 'Transcript not available to summarize.';
+  
+  const res = await postTranscript('/api/summary', transcript, transcriptId, language);
   
   if (!res.ok) {
     throw new Error(`Summary generation failed: ${res.statusText}`);
@@ -17,14 +39,10 @@ export async function generateSummary(transcript, language = 'en') {
   return data.summary || 'No summary generated.';
 }
 
-export async function extractKeyPoints(transcript, language = 'en') {
+export async function extractKeyPoints(transcript, language = 'en', transcriptId = null) {
   if (!transcript.trim()) return [];
   
-  const res = await fetch(`${API_BASE}/api/keypoints`, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ transcript: transcript, language }),
-  });
+  const res = await postTranscript('/api/keypoints', transcript, transcriptId, language);
   
   if (!res.ok) {
     throw new Error(`Key points extraction failed: ${res.statusText}`);
@@ -38,14 +56,10 @@ export async function extractKeyPoints(transcript, language = 'en') {
   return kp;
 }
 
-export async function generateQuestions(transcript, language = 'en') {
+export async function generateQuestions(transcript, language = 'en', transcriptId = null) {
   if (!transcript.trim()) return [];
   
-  const res = await fetch(`${API_BASE}/api/questions`, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ transcript: transcript, language }),
-  });
+  const res = await postTranscript('/api/questions', transcript, transcriptId, language);
   
   if (!res.ok) {
     throw new Error(`Question generation failed: ${res.statusText}`);
@@ -55,11 +69,41 @@ export async function generateQuestions(transcript, language = 'en') {
   return data.questions || [];
 }
 
+// Summary, key points and questions from a single backend call (one LLM round trip for all three)
+export async function generateStudyPack(transcript, language = 'en', transcriptId = null) {
+  if (!transcript.trim()) return { summary: 'Transcript not available to summarize.', keyPoints: [], questions: [] };
+
+  const res = await postTranscript('/api/study-pack', transcript, transcriptId, language);
+
+  if (!res.ok) {
+    throw new Error(`Study pack generation failed: ${res.statusText}`);
+  }
+
+  const data = await res.json();
+  return {
+    summary: data.summary || 'No summary generated.',
+    keyPoints: data.keyPoints || [],
+    questions: data.questions || [],
+  };
+}
+
+// Chat memory lives on the server; we only keep the session id per video
+const chatSessions = new Map();
+
 export async function answerQuestion(question, context, chatHistory, language = 'en') {
+  const videoKey = context.videoId || context.transcriptId || context.title;
   const res = await fetch(`${API_BASE}/api/answer`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ question, video: context, history: chatHistory.slice(-6), language }),
+    // the backend resolves the transcript from its handle, so don't upload it again
+    body: JSON.stringify({
+      question,
+      video: context.transcriptId ? { ...context, transcript: undefined } : context,
+      sessionId: chatSessions.get(videoKey),
+      // only used to seed a new session, e.g. after the old one expired
+      history: chatHistory.slice(-6),
+      language,
+    }),
   });
   
   if (!res.ok) {
@@ -67,15 +111,30 @@ export async function answerQuestion(question, context, chatHistory, language =
   }
   
   const data = await res.json();
+  if (data.sessionId) chatSessions.set(videoKey, data.sessionId);
   return data.answer || 'No response.';
 }
 
+const JOB_POLL_MS = 1000;
+
+// Background jobs keep the request short, so long videos don't hit proxy timeouts
+async function waitForJob(jobId) {
+  for (;;) {
+    const res = await fetch(`${API_BASE}/api/jobs/${jobId}`);
+    if (!res.ok) throw new Error('Failed to check processing status');
+    const job = await res.json();
+    if (job.status === 'succeeded') return job.result;
+    if (job.status === 'failed') throw new Error(job.error || 'Failed to process video');
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+  }
+}
+
 export async function processYouTubeVideo(url, language = 'en') {
   try {
     const response = await fetch(`${API_BASE}/api/process-video`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ url, language }),
+      body: JSON.stringify({ url, language, background: true }),
     });
 
     if (!response.ok) {
@@ -83,7 +142,7 @@ export async function processYouTubeVideo(url, language = 'en') {
       throw new Error(error.detail || 'Failed to process video');
     }
 
-    const data = await response.json();
+    const data = await waitForJob((await response.json()).jobId);
     
     if (!data.success) {
       throw new Error('Failed to process video');
@@ -96,6 +155,7 @@ export async function processYouTubeVideo(url, language = 'en') {
       title: data.videoInfo.title,
       thumbnailUrl: data.videoInfo.thumbnailUrl,
       transcript: data.transcript,
+      transcriptId: data.transcriptId,
       summary: data.summary,
       keyPoints: Array.isArray(data.keyPoints) && typeof data.keyPoints[0] === 'string'
         ? data.keyPoints.map((t, i) => ({ id: String(i + 1), text: t }))
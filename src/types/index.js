@@ -37,6 +37,7 @@
  * @property {string} title
  * @property {string} thumbnailUrl
  * @property {string} transcript
+ * @property {string=} transcriptId
  * @property {string|SummaryJson} summary
  * @property {{id:string,text:string}[]} keyPoints
  */